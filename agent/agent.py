@@ -1,26 +1,149 @@
-import os
-from langchain_groq import ChatGroq
+import os, asyncio, time
+from typing import AsyncIterator, Iterator
 from agent.prompts import SYSTEM_TUTOR, QA_TEMPLATE
-from agent.tools import tool_search_docs
-from langchain.prompts import ChatPromptTemplate
+from agent.tools import tool_search_docs, tool_search_docs_many
+from rag import registry, tracing
+from rag.index import index_version
 
-from dotenv import load_dotenv
-load_dotenv()
+def _llm():
+    return registry.llm()
 
-LLM = ChatGroq(model="llama-3.1-8b-instant", temperature=0.2)
+def _make_cache():
+    from agent.answer_cache import SemanticCache
+    # near-duplicate questions skip retrieval + the Groq call; reset when the index changes
+    return SemanticCache(registry.embeddings(), version_fn=lambda: index_version(registry.VECTORSTORE))
 
-def answer_question(question: str) -> str:
-    ctx, refs = tool_search_docs(question, k=4)
-    prompt = ChatPromptTemplate.from_template(QA_TEMPLATE).format(question=question, context=ctx)
-    msgs = [{"role":"system","content":SYSTEM_TUTOR},
-            {"role":"user","content":prompt}]
-    resp = LLM.invoke(msgs).content
-    # Append references
+def _cache():
+    return registry.get("answer_cache", _make_cache)
+
+def __getattr__(name):
+    if name == "LLM": return _llm()
+    if name == "CACHE": return _cache()
+    raise AttributeError(name)
+
+def format_references(refs: list) -> str:
     lines = ["\nReferences:"]
     for r in refs:
         src = r.get("source_file") or r.get("repo") or r.get("video_id") or r.get("source","?")
         ref = r.get("reference_text") or f"{r.get('chapter','?')}, {r.get('lesson','?')}"
         lines.append(f"- {src} | {ref}")
-    return resp + "\n" + "\n".join(lines)
+    return "\n".join(lines)
+
+def _messages(question: str, ctx: str) -> list:
+    from langchain_core.prompts import ChatPromptTemplate  # ~0.5s import, defer to first question
+    with tracing.span("prompt.format"):
+        prompt = ChatPromptTemplate.from_template(QA_TEMPLATE).format(question=question, context=ctx)
+    return [{"role":"system","content":SYSTEM_TUTOR},
+            {"role":"user","content":prompt}]
+
+@tracing.traced("agent.build_messages")
+def build_messages(question: str):
+    ctx, refs = tool_search_docs(question, k=4)
+    return _messages(question, ctx), refs
+
+def _cache_get(question: str):
+    with tracing.span("agent.cache_get") as sp:
+        hit = _cache().get(question)
+        if sp is not None: sp["hit"] = hit is not None
+        return hit
+
+def _invoke(msgs) -> str:
+    with tracing.span("llm.invoke"):
+        return _llm().invoke(msgs).content
+
+@tracing.traced("agent.answer_question")
+def answer_question(question: str, use_cache: bool = True) -> str:
+    hit = _cache_get(question) if use_cache else None
+    if hit:
+        resp, refs = hit
+        return resp + "\n" + format_references(refs)
+    msgs, refs = build_messages(question)
+    resp = _invoke(msgs)
+    if use_cache: _cache().put(question, resp, refs)
+    return resp + "\n" + format_references(refs)
+
+def answer_questions(questions: list[str], use_cache: bool = True, max_concurrency: int = 8) -> list[str]:
+    """answer_question for many questions; answers come back in input order.
+
+    Cache misses are retrieved as one batch and sent to Groq concurrently,
+    at most `max_concurrency` requests in flight. A failed Groq call fails
+    only its own question ("Answer failed: ..."), and is not cached.
+    """
+    out: list = [None] * len(questions)
+    todo = []
+    for i, q in enumerate(questions):
+        hit = _cache().get(q) if use_cache else None
+        if hit: out[i] = hit[0] + "\n" + format_references(hit[1])
+        else: todo.append(i)
+    if todo:
+        found = tool_search_docs_many([questions[i] for i in todo], k=4)
+        msgs = [_messages(questions[i], ctx) for i, (ctx, _) in zip(todo, found)]
+        resps = _llm().batch(msgs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+        for i, (_, refs), resp in zip(todo, found, resps):
+            if isinstance(resp, Exception):
+                out[i] = f"Answer failed: {resp!r}"
+                continue
+            if use_cache: _cache().put(questions[i], resp.content, refs)
+            out[i] = resp.content + "\n" + format_references(refs)
+    return out
+
+async def aanswer_question(question: str, use_cache: bool = True, timings: dict | None = None) -> str:
+    """answer_question for async callers (app.py). Cache lookup and retrieval run in the
+    default executor; `timings` collects seconds per stage (cache, retrieve, llm)."""
+    timings = {} if timings is None else timings
+    with tracing.span("agent.aanswer_question"):
+        hit = None
+        if use_cache:
+            t = time.perf_counter()
+            hit = await asyncio.to_thread(_cache_get, question)
+            timings["cache"] = time.perf_counter() - t
+        if hit:
+            resp, refs = hit
+            return resp + "\n" + format_references(refs)
+        t = time.perf_counter()
+        msgs, refs = await asyncio.to_thread(build_messages, question)
+        timings["retrieve"] = time.perf_counter() - t
+        t = time.perf_counter()
+        with tracing.span("llm.ainvoke"):
+            resp = (await _llm().ainvoke(msgs)).content
+        timings["llm"] = time.perf_counter() - t
+    if use_cache: await asyncio.to_thread(_cache().put, question, resp, refs)
+    return resp + "\n" + format_references(refs)
+
+# Streaming variants: references are known once retrieval is done, so they are
+# yielded first and the answer tokens follow as Groq produces them.
+def stream_answer(question: str, use_cache: bool = True) -> Iterator[str]:
+    hit = _cache().get(question) if use_cache else None
+    if hit:
+        resp, refs = hit
+        yield format_references(refs).strip() + "\n\n"
+        yield resp
+        return
+    msgs, refs = build_messages(question)
+    yield format_references(refs).strip() + "\n\n"
+    parts = []
+    for chunk in _llm().stream(msgs):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    if use_cache: _cache().put(question, "".join(parts), refs)
+
+async def astream_answer(question: str, use_cache: bool = True) -> AsyncIterator[str]:
+    # embedding + vector search are CPU-bound, keep them off the event loop
+    hit = await asyncio.to_thread(_cache().get, question) if use_cache else None
+    if hit:
+        resp, refs = hit
+        yield format_references(refs).strip() + "\n\n"
+        yield resp
+        return
+    msgs, refs = await asyncio.to_thread(build_messages, question)
+    yield format_references(refs).strip() + "\n\n"
+    parts = []
+    async for chunk in _llm().astream(msgs):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    if use_cache: await asyncio.to_thread(_cache().put, question, "".join(parts), refs)
 
-print("<<<<<", answer_question("What are Phase One requirements?")[:500], ">>>>>")
\ No newline at end of file
+if __name__ == "__main__":
+    print("<<<<<", answer_question("What are Phase One requirements?")[:500], ">>>>>")
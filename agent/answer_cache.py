@@ -0,0 +1,76 @@
+# agent/answer_cache.py
+"""Semantic answer cache: near-identical questions reuse an earlier answer.
+
+Questions are embedded and compared against cached questions by cosine
+similarity. The cache holds at most a few thousand entries, so one matrix
+product over all of them is the nearest-neighbour lookup (well under a
+millisecond). Entries expire after `ttl` seconds, the least recently used
+are evicted beyond `max_entries`, and everything is dropped when the
+vectorstore version changes.
+"""
+import threading, time
+from collections import OrderedDict
+import numpy as np
+
+class SemanticCache:
+    def __init__(self, embeddings, version_fn=None, threshold: float = 0.92,
+                 ttl: float = 24 * 3600, max_entries: int = 2000):
+        self.embeddings = embeddings
+        self.version_fn = version_fn or (lambda: None)
+        self.threshold, self.ttl, self.max_entries = threshold, ttl, max_entries
+        self._entries: OrderedDict = OrderedDict()  # question -> (vec, answer, refs, created)
+        self._matrix, self._keys, self._created = None, [], None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _vec(self, question: str) -> np.ndarray:
+        v = np.asarray(self.embeddings.embed_query(question.strip().lower()), dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _index(self):
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.vstack([e[0] for e in self._entries.values()]) if self._keys else None
+            self._created = np.array([e[3] for e in self._entries.values()])
+        return self._matrix
+
+    def _drop_expired(self):
+        # before the nearest-neighbour pick, so an expired best match can't hide a valid one
+        if self._index() is None: return
+        expired = np.flatnonzero(time.time() - self._created > self.ttl)
+        if not len(expired): return
+        for i in expired: del self._entries[self._keys[i]]
+        self._matrix = None
+
+    def get(self, question: str):
+        """Return (answer, refs) for a similar enough earlier question, else None."""
+        vec = self._vec(question)
+        with self._lock:
+            self._check_version()
+            self._drop_expired()
+            matrix = self._index()
+            if matrix is None: return None
+            sims = matrix @ vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold: return None
+            key = self._keys[best]
+            _, answer, refs, _ = self._entries[key]
+            self._entries.move_to_end(key)
+            return answer, refs
+
+    def put(self, question: str, answer: str, refs: list):
+        vec = self._vec(question)
+        with self._lock:
+            self._check_version()
+            self._entries[question] = (vec, answer, refs, time.time())
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
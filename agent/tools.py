@@ -1,23 +1,44 @@
 # agent/tools.py
-from rag.index import load_chroma
-from rag.retrieval import top_k
-from rag.loaders import load_youtube_transcript, load_github_readme
+import os
+from rag import registry, tracing
+from rag.context import CONTEXT_TOKENS, pack_context
+from rag.filters import SearchFilter
+from rag.retrieval import hybrid_top_k, hybrid_top_k_many, rerank_top_k
+
+OVERFETCH = 3  # candidates per requested chunk; duplicates and neighbours collapse in packing
+RERANK = os.getenv("NSK_RERANK", "0") == "1"  # cross-encoder stage, see rag.rerank
 
-VS = None
 def _vs():
-    global VS
-    if VS is None: VS = load_chroma()
-    return VS
+    return registry.chroma()
 
-def tool_search_docs(query: str, k:int=4):
-    docs = top_k(_vs(), query, k)
+def _context(docs, k, budget):
+    with tracing.span("context.pack", candidates=len(docs)):
+        docs = pack_context(docs, budget, max_blocks=k)
     ctx = "\n\n".join([f"[{i}] {d.page_content}" for i,d in enumerate(docs)])
     refs = [d.metadata for d in docs]
     return ctx, refs
 
+@tracing.traced("tools.search_docs")
+def tool_search_docs(query: str, k:int=4, budget:int=CONTEXT_TOKENS, rerank:bool | None=None,
+                     filter: SearchFilter | dict | None=None):
+    """filter: e.g. SearchFilter(type="youtube_transcript") or {"level": 2}; scopes the search.
+    level / section match on their number, so "Level 2" and "Level 2: Retrieval" work too."""
+    search = rerank_top_k if (RERANK if rerank is None else rerank) else hybrid_top_k
+    return _context(search(_vs(), query, k * OVERFETCH, filter=filter), k, budget)
+
+@tracing.traced("tools.search_docs_many")
+def tool_search_docs_many(queries: list[str], k:int=4, budget:int=CONTEXT_TOKENS, rerank:bool | None=None,
+                          filter: SearchFilter | dict | None=None):
+    """[(ctx, refs), ...] for each query, in order; queries are embedded and searched as one batch."""
+    if RERANK if rerank is None else rerank:
+        return [tool_search_docs(q, k, budget, rerank=True, filter=filter) for q in queries]
+    return [_context(docs, k, budget) for docs in hybrid_top_k_many(_vs(), queries, k * OVERFETCH, filter=filter)]
+
 def tool_fetch_youtube_transcript(url_or_id: str):
+    from rag.loaders import load_youtube_transcript  # pulls in pypdf / youtube deps, load on use
     return load_youtube_transcript(url_or_id)[0].page_content
 
 def tool_fetch_repo_readme(repo: str):
+    from rag.loaders import load_github_readme
     docs = load_github_readme(repo)
     return docs[0].page_content if docs else ""
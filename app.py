@@ -0,0 +1,168 @@
+# app.py
+"""HTTP service for the mentor agent: /ask, /search, /evaluate, /metrics.
+
+    uvicorn app:app --host 0.0.0.0 --port 8000
+    NSK_STUB_LLM=1 uvicorn app:app      # no Groq calls, for load tests (scripts/load_test.py)
+    NSK_TRACE=1 uvicorn app:app         # per-stage spans, /metrics/prometheus (rag.tracing)
+    NSK_ALLOW_PROFILE=1 uvicorn app:app # lets /ask take "profile": true (writes a file per request)
+
+One process shares a single warm embedding model, vectorstore and LLM
+client (rag.registry). CPU-bound work (embedding, vector search, repo
+scanning) runs on a bounded thread pool so the event loop keeps accepting
+requests. Identical questions / repos already in flight are coalesced and
+answered by one underlying call.
+"""
+import asyncio, os, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from rag import registry, tracing
+
+WORKERS = int(os.getenv("NSK_WORKERS", str(min(32, (os.cpu_count() or 1) * 2))))
+WINDOW = 2048  # latency samples kept per stage for percentiles
+ALLOW_PROFILE = os.getenv("NSK_ALLOW_PROFILE") == "1"  # profiles land on disk, one per request: opt-in
+
+class Metrics:
+    def __init__(self):
+        self.stages: dict[str, deque] = {}
+        self.counts: dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float):
+        self.stages.setdefault(stage, deque(maxlen=WINDOW)).append(seconds * 1000)
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def incr(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        out = {}
+        for stage, ms in self.stages.items():
+            s = sorted(ms)
+            out[stage] = {"count": self.counts[stage], "mean_ms": round(sum(s) / len(s), 2),
+                          "p50_ms": round(s[len(s) // 2], 2), "p95_ms": round(s[int(len(s) * 0.95)], 2),
+                          "max_ms": round(s[-1], 2)}
+        return {"stages": out, "counters": {k: v for k, v in self.counts.items() if k not in self.stages}}
+
+class Coalescer:
+    """Concurrent calls with the same key share one in-flight task."""
+    def __init__(self, metrics: Metrics, name: str):
+        self.inflight: dict = {}
+        self.metrics, self.name = metrics, name
+
+    async def run(self, key, factory):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.metrics.incr(f"{self.name}_coalesced")
+        return await asyncio.shield(task)  # one client disconnecting must not cancel the others
+
+METRICS = Metrics()
+ASK, EVALUATE = Coalescer(METRICS, "ask"), Coalescer(METRICS, "evaluate")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(WORKERS, thread_name_prefix="nsk")
+    loop.set_default_executor(pool)  # asyncio.to_thread in agent/evaluator code lands here too
+    t = time.perf_counter()
+    await loop.run_in_executor(pool, lambda: registry.warm_up())
+    METRICS.observe("warm_up", time.perf_counter() - t)
+    from evaluator.repo_eval_async import AsyncFetcher
+    app.state.fetcher = AsyncFetcher()
+    yield
+    pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="NSK.AI Mentor Agent", lifespan=lifespan)
+
+@app.middleware("http")
+async def timed(request: Request, call_next):
+    t = time.perf_counter()
+    response = await call_next(request)
+    METRICS.observe(f"http {request.url.path}", time.perf_counter() - t)
+    return response
+
+class AskRequest(BaseModel):
+    question: str
+    use_cache: bool = True
+    profile: bool = False  # profile this one request (rag.tracing.profile), skips coalescing; needs ALLOW_PROFILE
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 4
+    hybrid: bool = False
+    filter: dict[str, str | int | list[str | int]] | None = None  # rag.filters.SearchFilter fields
+
+class EvaluateRequest(BaseModel):
+    repo: str  # "owner/name"
+    rubric: str = "phase_one"
+
+@app.post("/ask")
+async def ask(req: AskRequest):
+    from agent.agent import aanswer_question, answer_question
+
+    if req.profile:
+        if not ALLOW_PROFILE: raise HTTPException(403, "profiling is off; start the server with NSK_ALLOW_PROFILE=1")
+        def profiled():
+            with tracing.profile("ask") as prof:
+                text = answer_question(req.question, req.use_cache)
+            return text, prof["path"]
+        text, path = await asyncio.to_thread(profiled)
+        return {"answer": text, "profile": path}
+
+    async def answer():
+        timings: dict = {}
+        text = await aanswer_question(req.question, req.use_cache, timings)
+        for stage, seconds in timings.items(): METRICS.observe(f"ask.{stage}", seconds)
+        return text
+
+    key = (" ".join(req.question.lower().split()), req.use_cache)
+    return {"answer": await ASK.run(key, answer)}
+
+@app.post("/search")
+async def search(req: SearchRequest):
+    from rag.filters import FIELDS
+    from rag.retrieval import hybrid_top_k, top_k
+
+    unknown = sorted(set(req.filter or {}) - set(FIELDS))
+    if unknown:
+        raise HTTPException(422, f"unknown filter field(s) {unknown}; expected one of {list(FIELDS)}")
+
+    def run():
+        vs = registry.chroma()
+        if req.hybrid: return hybrid_top_k(vs, req.query, req.k, filter=req.filter)
+        return top_k(vs, req.query, req.k, filter=req.filter)
+
+    t = time.perf_counter()
+    docs = await asyncio.to_thread(run)
+    METRICS.observe("search", time.perf_counter() - t)
+    return {"results": [{"content": d.page_content, "metadata": d.metadata} for d in docs]}
+
+@app.post("/evaluate")
+async def evaluate(req: EvaluateRequest, request: Request):
+    from evaluator.repo_eval_async import evaluate_repo_async
+
+    async def run():
+        t = time.perf_counter()
+        report = await evaluate_repo_async(req.repo, request.app.state.fetcher, rubric=req.rubric)
+        METRICS.observe("evaluate", time.perf_counter() - t)
+        return report
+
+    try:
+        return {"report": await EVALUATE.run((req.repo, req.rubric), run)}
+    except requests.RequestException as e:  # GitHub unreachable / throttled
+        raise HTTPException(502, f"GitHub fetch failed: {e!r}")
+
+@app.get("/metrics")
+async def metrics():
+    return METRICS.snapshot()
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    return tracing.prometheus_text()
@@ -1,23 +1,26 @@
 # dev_build.py (ad-hoc)
-from pathlib import Path
-from rag.loaders import load_pdf, load_markdown, load_youtube_transcript, load_github_readme
+from itertools import chain
+from rag.loaders import load_youtube_transcript, load_github_readme
 from rag.chunking import split_and_tag
-from rag.index import build_chroma
+from rag.index import ingest_incremental, load_chroma
+from rag.pipeline import iter_chunks
+from rag.retrieval import top_k
 
-docs = []
-docs += load_markdown(Path("data/phase_one_requirements.md"))
-docs += load_github_readme("Sumeya-H/textbook-tutor")  # adjust if needed
-#docs += load_youtube_transcript("https://www.youtube.com/watch?v=GR42jIvQjHs")  # sample
-# add a sample PDF locally: data/guide.pdf
-docs += load_pdf(Path("data/Level 1.pdf"))
+def main():
+    docs = []
+    docs += load_github_readme("Sumeya-H/textbook-tutor")  # adjust if needed
+    #docs += load_youtube_transcript("https://www.youtube.com/watch?v=GR42jIvQjHs")  # sample
 
-chunks = split_and_tag(docs)
-build_chroma(chunks)
-print("Index built with", len(chunks), "chunks")
+    # local files / PDF URLs are downloaded, parsed and chunked as a stream
+    files = ["data/phase_one_requirements.md", "data/Level 1.pdf"]
+    chunks = chain(split_and_tag(docs), iter_chunks(files))
+    stats = ingest_incremental(chunks)  # only new/changed chunks get embedded
+    print("Index synced:", stats)
 
+    vs = load_chroma()
+    for d in top_k(vs, "What are Phase One requirements?", 3):
+        print(d.metadata, d.page_content[:200], "\n---")
 
-from rag.index import load_chroma
-from rag.retrieval import top_k
-vs = load_chroma()
-for d in top_k(vs, "What are Phase One requirements?", 3):
-    print(d.metadata, d.page_content[:200], "\n---")
+# iter_chunks parses in a process pool; spawn-start workers re-import this file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# evaluator/cache.py
+"""SQLite cache for the repo evaluator.
+
+Blob texts are keyed by git blob SHA, so a resubmission only downloads the
+files that changed. Checklist results (evidence, excerpt, LLM feedback) are
+keyed by commit SHA + rubric hash, so an unchanged repo is answered from
+the cache without any fetching or LLM call.
+"""
+import hashlib, json, sqlite3, threading
+from pathlib import Path
+
+CACHE_PATH = ".cache/evaluator.sqlite"
+
+def rubric_key(criteria: dict) -> str:
+    # editing a rubric's patterns invalidates its cached results
+    return hashlib.sha1(json.dumps(criteria, sort_keys=True).encode()).hexdigest()[:16]
+
+class EvalCache:
+    def __init__(self, path: str = CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, text TEXT);
+            CREATE TABLE IF NOT EXISTS results (
+                commit_sha TEXT, rubric TEXT, evidence TEXT, excerpt TEXT, feedback TEXT,
+                PRIMARY KEY (commit_sha, rubric));
+        """)
+        self._lock = threading.Lock()
+
+    def blob(self, sha: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT text FROM blobs WHERE sha=?", (sha,)).fetchone()
+        return row[0] if row else None
+
+    def put_blob(self, sha: str, text: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?)", (sha, text))
+            self._db.commit()
+
+    def result(self, commit_sha: str, rubric: str):
+        """(evidence, excerpt, feedback) or None; feedback is None until the LLM ran."""
+        with self._lock:
+            row = self._db.execute("SELECT evidence, excerpt, feedback FROM results WHERE commit_sha=? AND rubric=?",
+                                   (commit_sha, rubric)).fetchone()
+        if not row: return None
+        evidence = {c: tuple(v) for c, v in json.loads(row[0]).items()}
+        return evidence, row[1], row[2]
+
+    def put_result(self, commit_sha: str, rubric: str, evidence: dict, excerpt: str, feedback: str | None = None):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                             (commit_sha, rubric, json.dumps(evidence), excerpt, feedback))
+            self._db.commit()
+
+_DEFAULT = None
+
+def default_cache() -> EvalCache:
+    global _DEFAULT
+    if _DEFAULT is None: _DEFAULT = EvalCache()
+    return _DEFAULT
@@ -0,0 +1,71 @@
+# evaluator/criteria.py
+"""Single-pass checklist matching.
+
+All patterns of a rubric are compiled into one case-insensitive alternation
+of zero-width lookaheads, so each file is scanned once as it arrives instead
+of once per pattern per criterion, and a match consumes no text: patterns of
+different criteria may overlap ("OpenAIEmbeddings" satisfies both
+"OpenAIEmbeddings" and "Embeddings"). At each position the alternation stops
+at, every unmet criterion's own regex is tried, so the results equal a
+separate `re.search` per criterion. The first hit of every criterion is kept
+as evidence (path, line, matched text).
+"""
+import json, re
+from pathlib import Path
+
+RUBRIC_DIR = "resources/requirements"
+
+class CriteriaMatcher:
+    def __init__(self, criteria: dict[str, list[str]]):
+        self.criteria = criteria
+        self._crit_re = {crit: re.compile("|".join(f"(?:{p})" for p in pats), re.I)
+                         for crit, pats in criteria.items() if pats}
+        self._combined: dict[frozenset, re.Pattern] = {}
+        self.evidence: dict[str, tuple[str, int, str]] = {}
+        self.missing: list[str] = []  # paths that could not be fetched; such results are not cached
+
+    @property
+    def done(self) -> bool:
+        return len(self.evidence) == len(self._crit_re)
+
+    def _pending(self) -> re.Pattern | None:
+        """Lookahead alternation over the criteria not satisfied yet, compiled once per set."""
+        pending = frozenset(c for c in self._crit_re if c not in self.evidence)
+        if not pending: return None
+        if pending not in self._combined:
+            self._combined[pending] = re.compile(
+                "|".join(f"(?=(?:{p}))" for c in self.criteria if c in pending for p in self.criteria[c]), re.I)
+        return self._combined[pending]
+
+    def feed(self, path: str, text: str):
+        """Scan one file; file paths count as line 0 (e.g. streamlit_app.py)."""
+        if self.done: return
+        self._scan(path, path, line_offset=-1)
+        self._scan(path, text)
+
+    def _scan(self, path: str, text: str, line_offset: int = 0):
+        line, counted, start = 1 + line_offset, 0, 0
+        rx = self._pending()
+        while rx is not None:
+            m = rx.search(text, start)
+            if m is None: return
+            pos = m.start()
+            line += text.count("\n", counted, pos); counted = pos
+            for crit, crx in self._crit_re.items():
+                if crit in self.evidence: continue
+                hit = crx.match(text, pos)
+                if hit: self.evidence[crit] = (path, line, hit.group())
+            rx, start = self._pending(), pos + 1
+
+    def results(self) -> dict[str, bool]:
+        return {crit: crit in self.evidence for crit in self.criteria}
+
+def load_rubrics(defaults: dict[str, dict] | None = None, rubric_dir: str = RUBRIC_DIR) -> dict[str, dict]:
+    """Rubrics by name: built-in `defaults` plus every `<name>.json` in `rubric_dir`.
+
+    A rubric file maps criterion -> list of regex patterns, like PHASE_ONE_CRITERIA.
+    """
+    rubrics = dict(defaults or {})
+    for path in sorted(Path(rubric_dir).glob("*.json")):
+        rubrics[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+    return rubrics
@@ -0,0 +1,31 @@
+# evaluator/notebooks.py
+"""Code and markdown cells out of .ipynb JSON.
+
+Raw notebook JSON is mostly outputs, base64 images and metadata; the grader
+and the repo index only want what the student wrote.
+"""
+import json
+
+def notebook_cells(raw: str) -> list[tuple[str, str]]:
+    """(cell_type, source) of the code and markdown cells; [] if `raw` is not a notebook."""
+    try:
+        nb = json.loads(raw)
+    except ValueError:
+        return []
+    if not isinstance(nb, dict): return []
+    cells = nb.get("cells") or [c for ws in nb.get("worksheets", []) for c in ws.get("cells", [])]  # nbformat 3
+    out = []
+    for c in cells:
+        src = c.get("source") or c.get("input") or ""
+        src = "".join(src) if isinstance(src, list) else src
+        if c.get("cell_type") in ("code", "markdown") and src.strip(): out.append((c["cell_type"], src))
+    return out
+
+def notebook_text(raw: str) -> str:
+    """The cells as percent-format script text; `raw` unchanged if it does not parse."""
+    cells = notebook_cells(raw)
+    if not cells: return raw
+    return "\n\n".join(("# %%\n" if kind == "code" else "# %% [markdown]\n") + src for kind, src in cells)
+
+def readable(path: str, text: str) -> str:
+    return notebook_text(text) if path.endswith(".ipynb") else text
@@ -0,0 +1,106 @@
+# evaluator/repo_eval_async.py
+"""Concurrent variant of repo_eval_phase1 for grading whole cohorts.
+
+Blob fetches run concurrently, capped per host by a semaphore. Each one is
+the sync helper from repo_eval_phase1 run in a worker thread, so both paths
+share rag.fetch's pooled session, ETag cache and backoff; the event loop
+only schedules them.
+"""
+import asyncio
+from collections import defaultdict
+from urllib.parse import urlparse
+from evaluator import repo_eval_phase1 as p1
+from evaluator.criteria import CriteriaMatcher
+from evaluator.cache import EvalCache, default_cache
+from evaluator.notebooks import readable
+
+PER_HOST = 8       # concurrent requests per host
+REPO_FANOUT = 4    # repos graded at once
+
+class AsyncFetcher:
+    """Async front for the repo_eval_phase1 GitHub helpers, at most `per_host` requests per host."""
+    def __init__(self, per_host: int = PER_HOST):
+        self._limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def _run(self, url: str, fn, *args):
+        async with self._limits[urlparse(url).netloc]:
+            return await asyncio.to_thread(fn, *args)
+
+    async def head(self, owner_repo: str) -> str | None:
+        return await self._run(p1.head_url(owner_repo), p1.resolve_head, owner_repo)
+
+    async def tree(self, owner_repo: str, ref: str = "HEAD") -> dict:
+        return await self._run(p1.tree_url(owner_repo, ref), p1.fetch_repo_tree, owner_repo, ref)
+
+    async def file(self, owner_repo: str, path: str, ref: str = "HEAD") -> str | None:
+        return await self._run(p1.file_url(owner_repo, path, ref), p1.fetch_blob, owner_repo, path, ref)
+
+async def scan_repo_async(owner_repo: str, fetcher: AsyncFetcher | None = None,
+                          criteria: dict = p1.PHASE_ONE_CRITERIA, cache: EvalCache | None = None,
+                          commit: str | None = None):
+    fetcher, cache = fetcher or AsyncFetcher(), cache or default_cache()
+    commit = commit or await fetcher.head(owner_repo)
+    hit = p1.cached_scan(criteria, commit, cache)
+    if hit: return hit[0], hit[1]
+    ref = commit or "HEAD"
+    matcher, excerpt = CriteriaMatcher(criteria), p1.ExcerptBuffer()
+    tree = await fetcher.tree(owner_repo, ref)
+    if not p1.tree_ok(tree): matcher.missing.append(p1.TREE)
+    blobs = p1.scan_blobs(tree)
+
+    async def grab(path, sha):
+        txt = cache.blob(sha) if sha else None
+        if txt is None:
+            txt = await fetcher.file(owner_repo, path, ref)
+            if txt is None:
+                matcher.missing.append(path); txt = ""
+            elif sha: cache.put_blob(sha, txt)
+        txt = readable(path, txt)
+        matcher.feed(path, txt[:p1.FILE_LIMIT])  # matched as soon as it arrives
+        return txt
+
+    texts = await asyncio.gather(*(grab(p, sha) for p, sha in blobs))
+    for (p, _), txt in zip(blobs, texts):
+        excerpt.add(p, txt)
+    p1.store_result(cache, commit, criteria, matcher, excerpt.text())
+    return matcher, excerpt.text()
+
+async def heuristic_scan_async(owner_repo: str, fetcher: AsyncFetcher | None = None,
+                               criteria: dict = p1.PHASE_ONE_CRITERIA):
+    matcher, excerpt = await scan_repo_async(owner_repo, fetcher, criteria)
+    return matcher.results(), excerpt
+
+async def evaluate_repo_async(owner_repo: str, fetcher: AsyncFetcher | None = None, llm=None,
+                              rubric: str = "phase_one", cache: EvalCache | None = None) -> str:
+    fetcher, cache = fetcher or AsyncFetcher(), cache or default_cache()
+    criteria = p1.rubric_criteria(rubric)
+    commit = await fetcher.head(owner_repo)
+    hit = p1.cached_scan(criteria, commit, cache)
+    if hit and hit[2] is not None:  # unchanged resubmission
+        report, _ = p1.build_prompt(owner_repo, hit[0], hit[1], rubric)
+        return f"Checklist:\n{report}\n\nFeedback:\n{hit[2]}"
+    matcher, excerpt = await scan_repo_async(owner_repo, fetcher, criteria, cache, commit)
+    report, prompt = p1.build_prompt(owner_repo, matcher, excerpt, rubric)
+    resp = await (llm or p1.get_llm()).ainvoke(prompt)
+    feedback = getattr(resp,'content',resp)
+    p1.store_result(cache, commit, criteria, matcher, excerpt, feedback)
+    return f"Checklist:\n{report}\n\nFeedback:\n{feedback}"
+
+async def evaluate_repos_async(owner_repos: list[str], fanout: int = REPO_FANOUT, llm=None,
+                               rubric: str = "phase_one") -> dict[str, str]:
+    """Grade many `owner/repo` names; one failing repo doesn't sink the batch."""
+    fetcher, gate = AsyncFetcher(), asyncio.Semaphore(fanout)
+
+    async def one(name):
+        async with gate:
+            try:
+                return await evaluate_repo_async(name, fetcher, llm, rubric)
+            except Exception as e:
+                return f"Evaluation failed: {e!r}"
+
+    reports = await asyncio.gather(*(one(n) for n in owner_repos))
+    return dict(zip(owner_repos, reports))
+
+def evaluate_repos(owner_repos: list[str], fanout: int = REPO_FANOUT, llm=None,
+                   rubric: str = "phase_one") -> dict[str, str]:
+    return asyncio.run(evaluate_repos_async(owner_repos, fanout, llm, rubric))
@@ -1,9 +1,20 @@
 # evaluator/repo_eval.py
 import re
 import requests
-from langchain_groq import ChatGroq
+from rag import fetch, registry
+from rag.fetch import API_BASE, RAW_BASE
+from evaluator.criteria import CriteriaMatcher, load_rubrics
+from evaluator.cache import EvalCache, default_cache, rubric_key
+from evaluator.notebooks import readable
 
-LLM = ChatGroq(model="llama3-8b-8192", temperature=0)
+EVAL_MODEL = "llama3-8b-8192"
+
+def get_llm():
+    return registry.llm(EVAL_MODEL, temperature=0)
+
+def __getattr__(name):
+    if name == "LLM": return get_llm()  # built on first use, not at import
+    raise AttributeError(name)
 
 PHASE_ONE_CRITERIA = {
     "Document ingestion with chunking": [
@@ -26,40 +37,156 @@ PHASE_ONE_CRITERIA = {
     ]
 }
 
-def fetch_repo_tree(owner_repo: str):
-    url = f"https://api.github.com/repos/{owner_repo}/git/trees/HEAD?recursive=1"
-    return requests.get(url).json()
-
-def fetch_file(owner_repo: str, path: str) -> str:
-    url = f"https://raw.githubusercontent.com/{owner_repo}/HEAD/{path}"
-    r = requests.get(url)
-    return r.text if r.status_code == 200 else ""
-
-def heuristic_scan(owner_repo: str):
-    tree = fetch_repo_tree(owner_repo)
-    paths = [it["path"] for it in tree.get("tree", []) if it.get("type") == "blob"]
-    big = ""
-    for p in paths:
-        if p.endswith((".py", ".md", ".txt", ".ipynb")):
-            txt = fetch_file(owner_repo, p)
-            big += f"\n\n## {p}\n{txt[:20000]}"
-    results = {crit: any(re.search(p, big, re.I) for p in pats) 
-               for crit, pats in PHASE_ONE_CRITERIA.items()}
-    return results, big[:80000]
-
-def evaluate_repo(owner_repo: str) -> str:
-    checks, excerpt = heuristic_scan(owner_repo)
+# API_BASE / RAW_BASE (rag.fetch) are overridable so the evaluator can run against a local stand-in server
+SCAN_EXTS = (".py", ".md", ".txt", ".ipynb")
+FILE_LIMIT, EXCERPT_LIMIT = 20000, 80000
+TIMEOUT = 30  # seconds per GitHub request
+TREE = "<tree>"  # stands in for the tree listing in CriteriaMatcher.missing
+COMMIT_RE = re.compile(r"[0-9a-f]{40}")
+
+SHA_HEADERS = {"Accept": "application/vnd.github.sha"}  # commits endpoint answers with the bare SHA
+
+def head_url(owner_repo: str) -> str:
+    return f"{API_BASE}/repos/{owner_repo}/commits/HEAD"
+
+def tree_url(owner_repo: str, ref: str = "HEAD") -> str:
+    return f"{API_BASE}/repos/{owner_repo}/git/trees/{ref}?recursive=1"
+
+def file_url(owner_repo: str, path: str, ref: str = "HEAD") -> str:
+    return f"{RAW_BASE}/{owner_repo}/{ref}/{path}"
+
+def scan_blobs(tree: dict) -> list[tuple[str, str]]:
+    """(path, blob sha) of the files the checklist looks at."""
+    return [(it["path"], it.get("sha")) for it in tree.get("tree", [])
+            if it.get("type") == "blob" and it["path"].endswith(SCAN_EXTS)]
+
+# All GitHub traffic goes through rag.fetch: pooled session, ETag revalidation, backoff.
+def resolve_head(owner_repo: str) -> str | None:
+    """HEAD commit SHA; None if GitHub has none (missing / empty repo).
+
+    Raises requests.HTTPError when throttled or failing: HEAD moves, so an
+    older answer must never stand in for it (it would key the cached grade)."""
+    r = fetch.default_fetcher().get(head_url(owner_repo), SHA_HEADERS, timeout=TIMEOUT)
+    if r.status_code == 200: return r.text.strip()
+    if r.status_code in (404, 409, 422): return None
+    raise requests.HTTPError(f"HEAD of {owner_repo}: HTTP {r.status_code}")
+
+def fetch_repo_tree(owner_repo: str, ref: str = "HEAD") -> dict:
+    """The recursive tree listing; {} (no "tree" key) when GitHub refused or failed."""
+    immutable = COMMIT_RE.fullmatch(ref) is not None  # a tree pinned to a commit never changes
+    r = fetch.default_fetcher().get(tree_url(owner_repo, ref), max_age=float("inf") if immutable else 0,
+                                    timeout=TIMEOUT, immutable=immutable)
+    return r.json() if r.status_code == 200 else {}
+
+def tree_ok(tree: dict) -> bool:
+    return isinstance(tree, dict) and "tree" in tree
+
+def fetch_blob(owner_repo: str, path: str, ref: str = "HEAD") -> str | None:
+    """File text, or None if it could not be fetched (an empty file is "")."""
+    # bodies are cached by blob SHA (EvalCache), not a second time by URL
+    r = fetch.default_fetcher().get(file_url(owner_repo, path, ref), timeout=TIMEOUT, cache=False)
+    return r.text if r.status_code == 200 else None
+
+def fetch_file(owner_repo: str, path: str, ref: str = "HEAD") -> str:
+    return fetch_blob(owner_repo, path, ref) or ""
+
+class ExcerptBuffer:
+    """Collects "## path" sections up to `limit` chars without quadratic string concatenation."""
+    def __init__(self, limit: int = EXCERPT_LIMIT):
+        self.limit, self.size, self.parts = limit, 0, []
+
+    def add(self, path: str, text: str):
+        if self.size >= self.limit: return
+        part = f"\n\n## {path}\n{text[:FILE_LIMIT]}"[:self.limit - self.size]
+        self.parts.append(part)
+        self.size += len(part)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+def rubric_criteria(rubric: str = "phase_one") -> dict:
+    return load_rubrics({"phase_one": PHASE_ONE_CRITERIA})[rubric]
+
+def cached_scan(criteria: dict, commit: str | None, cache: EvalCache):
+    """(matcher, excerpt, feedback) stored for this commit + rubric, or None."""
+    hit = cache.result(commit, rubric_key(criteria)) if commit else None
+    if not hit: return None
+    matcher = CriteriaMatcher(criteria)
+    matcher.evidence = hit[0]
+    return matcher, hit[1], hit[2]
+
+def scan_repo(owner_repo: str, criteria: dict = PHASE_ONE_CRITERIA, cache: EvalCache | None = None,
+              commit: str | None = None):
+    """One pass over each file as it is fetched; returns (matcher, excerpt).
+
+    Pinned to the HEAD commit SHA: an already graded commit comes straight
+    from the cache and unchanged blobs are never downloaded twice.
+    """
+    cache = cache or default_cache()
+    commit = commit or resolve_head(owner_repo)
+    hit = cached_scan(criteria, commit, cache)
+    if hit: return hit[0], hit[1]
+    ref = commit or "HEAD"
+    matcher, excerpt = CriteriaMatcher(criteria), ExcerptBuffer()
+    tree = fetch_repo_tree(owner_repo, ref)
+    if not tree_ok(tree): matcher.missing.append(TREE)
+    for p, sha in scan_blobs(tree):
+        txt = cache.blob(sha) if sha else None
+        if txt is None:
+            txt = fetch_blob(owner_repo, p, ref)
+            if txt is None:
+                matcher.missing.append(p); txt = ""
+            elif sha: cache.put_blob(sha, txt)
+        txt = readable(p, txt)  # notebook cells, not raw JSON / outputs
+        matcher.feed(p, txt[:FILE_LIMIT])
+        excerpt.add(p, txt)
+    store_result(cache, commit, criteria, matcher, excerpt.text())
+    return matcher, excerpt.text()
+
+def store_result(cache: EvalCache, commit: str | None, criteria: dict, matcher: CriteriaMatcher, excerpt: str,
+                 feedback: str | None = None):
+    # a throttled / failed fetch must not pin incomplete evidence to the commit SHA
+    if commit and not matcher.missing:
+        cache.put_result(commit, rubric_key(criteria), matcher.evidence, excerpt, feedback)
+
+def heuristic_scan(owner_repo: str, criteria: dict = PHASE_ONE_CRITERIA):
+    matcher, excerpt = scan_repo(owner_repo, criteria)
+    return matcher.results(), excerpt
+
+def format_check(crit: str, ok: bool, evidence: dict) -> str:
+    if not ok: return f"- {crit}: ❌"
+    path, line, hit = evidence[crit]
+    return f"- {crit}: ✅ ({path}:{line} `{hit}`)"
+
+def build_prompt(owner_repo: str, matcher: CriteriaMatcher, excerpt: str,
+                 rubric: str = "phase_one") -> tuple[str, str]:
+    checks = matcher.results()
     score, total = sum(checks.values()), len(checks)
-    report = "\n".join([f"- {c}: {'✅' if v else '❌'}" for c, v in checks.items()])
+    report = "\n".join([format_check(c, v, matcher.evidence) for c, v in checks.items()])
+    if matcher.missing:
+        report += f"\n(incomplete: {len(matcher.missing)} file(s) could not be fetched, results not cached)"
     prompt = f"""
 You are a senior reviewer.
 Repo: {owner_repo}
 
-Phase One results ({score}/{total}):
+{rubric.replace('_', ' ').title()} results ({score}/{total}):
 {report}
 
 Based on this excerpt, give fixes for unmet items only:
 {excerpt[:6000]}
 """
-    resp = LLM.invoke(prompt)
-    return f"Checklist:\n{report}\n\nFeedback:\n{getattr(resp,'content',resp)}"
+    return report, prompt
+
+def evaluate_repo(owner_repo: str, rubric: str = "phase_one", cache: EvalCache | None = None, llm=None) -> str:
+    criteria, cache = rubric_criteria(rubric), cache or default_cache()
+    commit = resolve_head(owner_repo)
+    hit = cached_scan(criteria, commit, cache)
+    if hit and hit[2] is not None:  # unchanged resubmission
+        report, _ = build_prompt(owner_repo, hit[0], hit[1], rubric)
+        return f"Checklist:\n{report}\n\nFeedback:\n{hit[2]}"
+    matcher, excerpt = scan_repo(owner_repo, criteria, cache, commit)
+    report, prompt = build_prompt(owner_repo, matcher, excerpt, rubric)
+    resp = (llm or get_llm()).invoke(prompt)
+    feedback = getattr(resp,'content',resp)
+    store_result(cache, commit, criteria, matcher, excerpt, feedback)
+    return f"Checklist:\n{report}\n\nFeedback:\n{feedback}"
@@ -0,0 +1,237 @@
+# evaluator/repo_index.py
+"""Searchable index of past-cohort project repos.
+
+Repos are fetched through the evaluator's GitHub helpers and blob cache, so a
+file already downloaded for grading is not downloaded again. Notebooks are
+reduced to their code and markdown cells (outputs and JSON dropped), Python
+is chunked along function / class boundaries with `ast`, prose with the
+course splitter. Chunks go to a Chroma store of their own (REPO_STORE) with
+ids derived from repo + path, and a manifest next to it records the HEAD
+commit and the blob SHA of every indexed file: an unchanged repo costs one
+request, a changed one only re-embeds the files whose SHA moved. A sync in
+which the tree or a file could not be fetched changes nothing it could not
+see and leaves the commit unrecorded, so the next sync retries it.
+
+    python -m evaluator.repo_index owner/a owner/b      # index / sync
+    python -m evaluator.repo_index --query "FAISS retriever with reranking"
+"""
+import argparse, ast, json, os, re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from langchain_core.documents import Document
+from rag import registry, tracing
+from rag.bm25 import BM25_FILE, build_from_store, update_file
+from rag.chunking import SPLITTER
+from rag.filters import SearchFilter
+from rag.index import UPSERT_BATCH, chunk_id, load_manifest, save_manifest, source_key, write_chunks
+from evaluator import repo_eval_phase1 as p1
+from evaluator.cache import EvalCache, default_cache
+from evaluator.notebooks import notebook_cells
+
+REPO_STORE = os.getenv("NSK_REPO_STORE", "vectorstore_repos")
+REPO_MANIFEST = "repo_manifest.json"
+REPO_TYPES = ("repo_code", "repo_notebook", "repo_doc")
+CHUNK_CHARS = 2000     # adjacent functions / cells are packed up to this size
+MAX_FILE_BYTES = 2_000_000
+FETCH_WORKERS = 8
+
+DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+MAGIC_RE = re.compile(r"^(\s*)([%!].*)$", re.MULTILINE)  # IPython magics / shell escapes
+
+# --- chunking ---
+def _blocks(body: list, first: int, last: int, lines: list[str], qual: str) -> list[tuple[str, int, int]]:
+    """(symbol, first line, last line) covering lines first..last: one block per def,
+    runs of other statements grouped; an oversized class is split into its members.
+    Comments and decorators above a def belong to it."""
+    out, run_start, prev_end = [], first, first - 1
+    for node in body:
+        if isinstance(node, DEFS):
+            if run_start <= prev_end: out.append((qual or "<module>", run_start, prev_end))
+            name, start = f"{qual}.{node.name}" if qual else node.name, prev_end + 1
+            if isinstance(node, ast.ClassDef) and len("".join(lines[start - 1:node.end_lineno])) > CHUNK_CHARS:
+                out += _blocks(node.body, start, node.end_lineno, lines, name)
+            else:
+                out.append((name, start, node.end_lineno))
+            run_start = node.end_lineno + 1
+        prev_end = node.end_lineno
+    if run_start <= last: out.append((qual or "<module>", run_start, last))
+    return out
+
+def _split(symbol: str, text: str, first_line: int) -> list[tuple[str, int, int, str]]:
+    """Oversized text through the course splitter, keeping line numbers."""
+    out, pos = [], 0
+    for part in SPLITTER.split_text(text):
+        at = text.find(part, pos)
+        at = pos if at < 0 else at
+        line = first_line + text.count("\n", 0, at)
+        out.append((symbol, line, line + part.count("\n"), part))
+        pos = at + 1
+    return out
+
+def code_pieces(code: str, first_line: int = 1) -> list[tuple[str, int, int, str]]:
+    """(symbol, first line, last line, text) along def / class boundaries; None on a syntax error."""
+    try:
+        tree = ast.parse(MAGIC_RE.sub(r"\1#\2", code))  # same line count, so line numbers still match
+    except (SyntaxError, ValueError):
+        return None
+    lines = code.splitlines(keepends=True)
+    out = []
+    for symbol, a, b in _blocks(tree.body, 1, len(lines), lines, ""):
+        text = "".join(lines[a - 1:b])
+        if not text.strip(): continue
+        if len(text) > CHUNK_CHARS: out += _split(symbol, text, a + first_line - 1)
+        else: out.append((symbol, a + first_line - 1, b + first_line - 1, text))
+    return out
+
+def _pack(pieces: list[tuple[str, int, int, str]]) -> list[tuple[str, int, int, str]]:
+    """Merge adjacent small pieces up to CHUNK_CHARS; no piece is ever cut."""
+    out = []
+    for symbol, a, b, text in pieces:
+        if out and len(out[-1][3]) + len(text) <= CHUNK_CHARS:
+            s, a0, _, t = out[-1]
+            names = [n for n in s.split(", ") if n]
+            if symbol and symbol not in names: names.append(symbol)
+            out[-1] = (", ".join(names), a0, b, t.rstrip("\n") + "\n\n" + text)
+        else:
+            out.append((symbol, a, b, text))
+    return out
+
+def file_pieces(path: str, text: str) -> tuple[str, str, list[tuple[str, int, int, str]]]:
+    """(type, unit, pieces): unit is "line" or "cell" for the first / last numbers."""
+    if path.endswith(".ipynb"):
+        pieces = []
+        for i, (kind, src) in enumerate(notebook_cells(text), 1):
+            if len(src) <= CHUNK_CHARS: pieces.append(("", i, i, src))
+            else:
+                parts = code_pieces(src) if kind == "code" else None
+                pieces += [(s.replace("<module>", ""), i, i, t) for s, _, _, t in parts or _split("", src, 1)]
+        return "repo_notebook", "cell", _pack(pieces)
+    if path.endswith(".py"):
+        pieces = code_pieces(text)
+        if pieces is not None: return "repo_code", "line", _pack(pieces)
+    return ("repo_code" if path.endswith(".py") else "repo_doc"), "line", _split("", text, 1)
+
+def repo_chunks(owner_repo: str, path: str, sha: str, text: str, ref: str = "HEAD") -> list[Document]:
+    kind, unit, pieces = file_pieces(path, text)
+    docs = []
+    for symbol, a, b, body in pieces:
+        where = f"{unit}s {a}-{b}" if a != b else f"{unit} {a}"
+        label = f"{path} {symbol}".strip()
+        docs.append(Document(page_content=f"# {owner_repo}/{label}\n{body}", metadata={
+            "type": kind, "repo": owner_repo, "path": path, "blob_sha": sha or "", "symbol": symbol,
+            "start": a, "end": b, "source": f"https://github.com/{owner_repo}/blob/{ref}/{path}",
+            "reference_text": f"{label} ({where})"}))
+    return docs
+
+# --- incremental indexing ---
+def index_blobs(tree: dict) -> list[tuple[str, str]]:
+    return [(it["path"], it.get("sha")) for it in tree.get("tree", [])
+            if it.get("type") == "blob" and it["path"].endswith(p1.SCAN_EXTS)
+            and it.get("size", 0) <= MAX_FILE_BYTES]
+
+def _ids(owner_repo: str, path: str, n: int) -> list[str]:
+    src = source_key({"repo": owner_repo, "path": path})
+    return [chunk_id(src, i) for i in range(n)]
+
+def _text(owner_repo: str, path: str, sha: str | None, ref: str, cache: EvalCache) -> str | None:
+    """File text (blob cache first); None if the download failed."""
+    txt = cache.blob(sha) if sha else None
+    if txt is None:
+        txt = p1.fetch_blob(owner_repo, path, ref)
+        if sha and txt is not None: cache.put_blob(sha, txt)
+    return txt
+
+@tracing.traced("repo_index.index_repo")
+def index_repo(owner_repo: str, vs, manifest: dict, cache: EvalCache | None = None,
+               bm25_path: str | None = None) -> dict:
+    """Bring one repo's chunks in `vs` (and the BM25 index at `bm25_path`) up to date
+    with its HEAD; updates `manifest` in place.
+
+    `missing` in the returned stats lists what could not be fetched (p1.TREE for
+    the tree listing). Those files keep their old chunks and manifest entries,
+    and the commit is only recorded once nothing is missing.
+    """
+    cache = cache or default_cache()
+    stats = {"files_indexed": 0, "files_skipped": 0, "files_deleted": 0, "chunks": 0, "missing": []}
+    entry = manifest.get(owner_repo, {})
+    old = entry.get("files", {})
+    commit = p1.resolve_head(owner_repo)
+    if commit and entry.get("commit") == commit:
+        stats["files_skipped"] = len(old)
+        return stats
+    ref = commit or "HEAD"
+    tree = p1.fetch_repo_tree(owner_repo, ref)
+    if not p1.tree_ok(tree):  # throttled / failed: not "every file was deleted"
+        stats["files_skipped"], stats["missing"] = len(old), [p1.TREE]
+        return stats
+    blobs = index_blobs(tree)
+    changed = [(p, sha) for p, sha in blobs if not sha or old.get(p, [None])[0] != sha]
+    todo = {p for p, _ in changed}
+    files = {p: old[p] for p, _ in blobs if p not in todo}
+    stats["files_skipped"] = len(files)
+
+    with ThreadPoolExecutor(FETCH_WORKERS) as pool:
+        texts = list(pool.map(lambda b: _text(owner_repo, b[0], b[1], ref, cache), changed))
+    ids, docs, stale = [], [], []
+    for (p, sha), txt in zip(changed, texts):
+        if txt is None:  # keep what is indexed; retried next sync
+            stats["missing"].append(p)
+            if p in old: files[p] = old[p]
+            continue
+        chunks = repo_chunks(owner_repo, p, sha, txt, ref)
+        ids += _ids(owner_repo, p, len(chunks)); docs += chunks
+        stale += _ids(owner_repo, p, old.get(p, [None, 0])[1])[len(chunks):]
+        files[p] = [sha, len(chunks)]
+        stats["files_indexed"] += 1
+    for p in old.keys() - files.keys():
+        stale += _ids(owner_repo, p, old[p][1])
+        stats["files_deleted"] += 1
+    for i in range(0, len(ids), UPSERT_BATCH):
+        write_chunks(vs, ids[i:i + UPSERT_BATCH], docs[i:i + UPSERT_BATCH])
+    for i in range(0, len(stale), UPSERT_BATCH):
+        vs.delete(ids=stale[i:i + UPSERT_BATCH])
+    if bm25_path and (ids or stale):
+        with tracing.span("index.bm25"):
+            update_file(vs, bm25_path, list(zip(ids, docs)), stale)
+    stats["chunks"] = len(docs)
+    manifest[owner_repo] = {"commit": None if stats["missing"] else commit, "files": files}
+    return stats
+
+def index_repos(owner_repos: list[str], persist_dir: str = REPO_STORE, cache: EvalCache | None = None) -> dict:
+    """Index / sync many repos; the manifest is saved after each one so an interrupted run resumes."""
+    vs, manifest = registry.chroma(persist_dir), load_manifest(persist_dir, REPO_MANIFEST)
+    bm25_path = str(Path(persist_dir) / BM25_FILE)
+    report = {}
+    for name in owner_repos:
+        try:
+            report[name] = index_repo(name, vs, manifest, cache, bm25_path)
+        except requests.RequestException as e:  # HEAD unresolvable right now; the others still sync
+            report[name] = {"error": repr(e)}
+            continue
+        save_manifest(manifest, persist_dir, REPO_MANIFEST)
+    if not os.path.exists(bm25_path):
+        build_from_store(vs, bm25_path)
+    return report
+
+def search_projects(query: str, k: int = 5, repo: str | list[str] | None = None, kind: str | None = None,
+                    hybrid: bool = True, persist_dir: str = REPO_STORE) -> list[Document]:
+    """Past-project chunks for `query`; hybrid by default since identifiers match best lexically."""
+    from rag.retrieval import hybrid_top_k, top_k
+    f = SearchFilter(type=kind or REPO_TYPES, repo=repo)
+    vs = registry.chroma(persist_dir)
+    return hybrid_top_k(vs, query, k, filter=f) if hybrid else top_k(vs, query, k, filter=f)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("repos", nargs="*", help="owner/name of repos to index")
+    ap.add_argument("--repos-file", help="file with one owner/name per line")
+    ap.add_argument("--query")
+    ap.add_argument("-k", type=int, default=5)
+    args = ap.parse_args()
+    repos = list(args.repos)
+    if args.repos_file: repos += [l.strip() for l in Path(args.repos_file).read_text().splitlines() if l.strip()]
+    if repos: print(json.dumps(index_repos(repos), indent=1))
+    if args.query:
+        for d in search_projects(args.query, args.k):
+            print(f"- {d.metadata['repo']} | {d.metadata['reference_text']}")
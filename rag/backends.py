@@ -0,0 +1,243 @@
+# rag/backends.py
+"""One search interface over the vector stores used in this repo.
+
+`as_backend(vs)` wraps any LangChain vector store (the Chroma store from
+rag.index, the FAISS store behind retrieval.py); `FaissBackend` serves a
+quantized faiss index (IVF-PQ / SQ8) opened memory-mapped, with a SQLite
+docstore so neither vectors nor texts have to fit in RAM. Every backend
+returns Documents, and scores are relevance values where higher is better.
+"""
+from __future__ import annotations
+import json, math, sqlite3, threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING
+from rag import tracing
+from rag.filters import META_KEYS, SearchFilter, as_filter
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+INDEX_FILE, DOCS_FILE = "index.faiss", "docs.sqlite"
+NPROBE = 16
+SUBSET_SCAN = 4096    # filtered subsets up to this size are scored exactly, row by row
+FILTER_FETCH_K = 200  # candidates LangChain FAISS post-filters (it cannot pre-filter)
+
+def embed_queries(embeddings, queries: list[str]):
+    # one batched forward pass instead of one embed_query call per query, where the model allows it
+    with tracing.span("embed.queries", n=len(queries)):
+        if hasattr(embeddings, "embed_queries"): return embeddings.embed_queries(queries)
+        from rag.embed_cache import query_vectors
+        return query_vectors(embeddings, queries)
+
+def embed_query(embeddings, query: str):
+    with tracing.span("embed.query"):
+        return embeddings.embed_query(query)
+
+class VectorBackend(ABC):
+    # filter: a rag.filters.SearchFilter (or dict of its fields), applied before ranking
+    def search(self, query: str, k: int = 4, filter=None) -> list[Document]:
+        return [d for d, _ in self.search_with_scores(query, k, filter)]
+
+    @abstractmethod
+    def search_with_scores(self, query: str, k: int = 4, filter=None) -> list[tuple[Document, float]]:
+        """(document, relevance) pairs, best first."""
+
+    def search_many(self, queries: list[str], k: int = 4, filter=None) -> list[list[Document]]:
+        return [[d for d, _ in hits] for hits in self.search_many_with_scores(queries, k, filter)]
+
+    def search_many_with_scores(self, queries: list[str], k: int = 4, filter=None) -> list[list[tuple[Document, float]]]:
+        return [self.search_with_scores(q, k, filter) for q in queries]
+
+class LangChainBackend(VectorBackend):
+    def __init__(self, vs):
+        self.vs = vs
+
+    def _filter_kwargs(self, f: SearchFilter | None) -> dict:
+        if f is None: return {}
+        if hasattr(self.vs, "_collection"): return {"filter": f.to_chroma()}  # Chroma `where`, pre-filtered
+        return {"filter": f.matches, "fetch_k": FILTER_FETCH_K}
+
+    def search(self, query: str, k: int = 4, filter=None) -> list[Document]:
+        # embed and search as separate steps so traces show where the time goes
+        vec = embed_query(self.vs.embeddings, query)
+        with tracing.span("vector.search", k=k):
+            return self.vs.similarity_search_by_vector(vec, k=k, **self._filter_kwargs(as_filter(filter)))
+
+    def search_with_scores(self, query: str, k: int = 4, filter=None) -> list[tuple[Document, float]]:
+        with tracing.span("vector.search_with_scores", k=k):
+            return self.vs.similarity_search_with_relevance_scores(query, k=k, **self._filter_kwargs(as_filter(filter)))
+
+    def search_many_with_scores(self, queries: list[str], k: int = 4, filter=None) -> list[list[tuple[Document, float]]]:
+        if not queries: return []
+        vs, f = self.vs, as_filter(filter)
+        if hasattr(vs, "_collection"):    # Chroma: one query call for all vectors
+            return self._chroma_many(embed_queries(vs.embeddings, queries), k, f)
+        if hasattr(vs, "index_to_docstore_id") and f is None:  # LangChain FAISS: one index.search
+            return self._faiss_many(embed_queries(vs.embeddings, queries), k)
+        return super().search_many_with_scores(queries, k, f)
+
+    def _chroma_many(self, vecs, k: int, f: SearchFilter | None = None):
+        from langchain_core.documents import Document
+        with tracing.span("vector.search", k=k, queries=len(vecs)):
+            res = self.vs._collection.query(query_embeddings=vecs, n_results=k, where=f.to_chroma() if f else None,
+                                            include=["documents", "metadatas", "distances"])
+        relevance = self.vs._select_relevance_score_fn()
+        return [[(Document(id=i, page_content=t, metadata=m or {}), relevance(dist))
+                 for i, t, m, dist in zip(*row)]
+                for row in zip(res["ids"], res["documents"], res["metadatas"], res["distances"])]
+
+    def _faiss_many(self, vecs, k: int):
+        import numpy as np
+        vs = self.vs
+        vecs = _normalize(vecs) if vs._normalize_L2 else np.asarray(vecs, dtype=np.float32)
+        with tracing.span("vector.search", k=k, queries=len(vecs)):
+            scores, rows = vs.index.search(vecs, k)
+        relevance = vs._select_relevance_score_fn()
+        return [[(vs.docstore.search(vs.index_to_docstore_id[int(r)]), relevance(float(s)))
+                 for s, r in zip(srow, rrow) if r >= 0]
+                for srow, rrow in zip(scores, rows)]
+
+def as_backend(vs) -> VectorBackend:
+    return vs if isinstance(vs, VectorBackend) else LangChainBackend(vs)
+
+def _normalize(vecs):
+    import numpy as np
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True).clip(min=1e-12)
+    return vecs
+
+KINDS = ("ivfpq", "ivfsq8", "sq8", "flat")
+
+def _check_kind(kind: str):
+    if kind not in KINDS: raise ValueError(f"unknown faiss index kind {kind!r}; expected one of {KINDS}")
+
+def _make_index(kind: str, dim: int, n: int, m: int):
+    import faiss
+    _check_kind(kind)
+    ip = faiss.METRIC_INNER_PRODUCT  # cosine on normalised vectors
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))  # faiss wants ~39 training points per list
+    if kind == "ivfpq" and n >= 39 * 256 and dim % m == 0:  # 8-bit PQ codebooks
+        return faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, m, 8, ip)
+    if kind in ("ivfpq", "ivfsq8") and nlist > 1:
+        return faiss.IndexIVFScalarQuantizer(faiss.IndexFlatIP(dim), dim, nlist, faiss.ScalarQuantizer.QT_8bit, ip)
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    # sq8, or ivf* with too few vectors to train IVF lists yet
+    return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, ip)
+
+def build_faiss(docs: list[Document], path: str, kind: str = "ivfpq", m: int = 16, embeddings=None):
+    """Write a quantized faiss index + docstore for `docs` under `path`.
+
+    kind: "ivfpq" (smallest), "ivfsq8", "sq8" or "flat". Small corpora that
+    cannot train IVF/PQ codebooks fall back to SQ8.
+    """
+    import faiss
+    from rag import registry
+    from rag.embedder import embed_texts
+    _check_kind(kind)
+    out = Path(path); out.mkdir(parents=True, exist_ok=True)
+    vecs = _normalize(embed_texts([d.page_content for d in docs], embeddings or registry.embeddings(),
+                                  registry.EMB_MODEL))
+    index = _make_index(kind, vecs.shape[1], len(vecs), m)
+    if not index.is_trained: index.train(vecs)
+    index.add(vecs)
+    faiss.write_index(index, str(out / INDEX_FILE))
+    (out / DOCS_FILE).unlink(missing_ok=True)
+    db = sqlite3.connect(out / DOCS_FILE)
+    db.executescript("""
+        CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT, text TEXT, meta TEXT);
+        CREATE TABLE meta (field TEXT, value TEXT, row INTEGER);
+    """)
+    db.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)",
+                   [(i, getattr(d, "id", None), d.page_content, json.dumps(d.metadata)) for i, d in enumerate(docs)])
+    # filterable fields, so a SearchFilter resolves to row ids with one indexed lookup per field
+    db.executemany("INSERT INTO meta VALUES (?, ?, ?)",
+                   [(k, str(d.metadata[k]), i) for i, d in enumerate(docs) for k in META_KEYS if d.metadata.get(k)])
+    db.execute("CREATE INDEX meta_field_value ON meta(field, value)")
+    db.commit(); db.close()
+    return FaissBackend(path, embeddings)
+
+class FaissBackend(VectorBackend):
+    def __init__(self, path: str, embeddings=None, nprobe: int = NPROBE):
+        import faiss
+        from rag import registry
+        self.embeddings = embeddings or registry.embeddings()
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        self.index = faiss.read_index(str(Path(path) / INDEX_FILE), flags)
+        self.nprobe = nprobe
+        self._db = sqlite3.connect(Path(path) / DOCS_FILE, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @property
+    def nprobe(self) -> int:
+        return self._nprobe
+
+    @nprobe.setter
+    def nprobe(self, value: int):
+        # more lists probed = better recall, slower search; no-op for non-IVF indexes
+        import faiss
+        self._nprobe = value
+        try:
+            faiss.extract_index_ivf(self.index).nprobe = value
+        except RuntimeError:
+            pass
+
+    def _docs(self, rows: list[int]) -> dict[int, Document]:
+        from langchain_core.documents import Document
+        with self._lock:
+            found = self._db.execute(f"SELECT row, id, text, meta FROM docs WHERE row IN ({','.join('?' * len(rows))})",
+                                     rows).fetchall()
+        return {r: Document(id=i, page_content=t, metadata=json.loads(m)) for r, i, t, m in found}
+
+    def rows_matching(self, f: SearchFilter) -> list[int]:
+        rows = None
+        with self._lock:
+            for field, vals in f.fields.items():
+                found = {r for r, in self._db.execute(
+                    f"SELECT row FROM meta WHERE field=? AND value IN ({','.join('?' * len(vals))})", (field, *vals))}
+                rows = found if rows is None else rows & found
+                if not rows: break
+        return sorted(rows or ())
+
+    def _search_subset(self, vecs, k: int, rows: list[int]):
+        import faiss, numpy as np
+        ids = np.asarray(rows, dtype=np.int64)
+        if len(rows) <= SUBSET_SCAN:
+            try:  # flat / SQ indexes: decode just the subset and score it exactly
+                sub = self.index.reconstruct_batch(ids)
+            except RuntimeError:  # IVF has no direct map on a read-only index
+                sub = None
+            if sub is not None:
+                sims = vecs @ sub.T
+                top = np.argsort(-sims, axis=1)[:, :k]
+                return np.take_along_axis(sims, top, axis=1), ids[top]
+        sel = faiss.IDSelectorBatch(ids)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None:
+            params = faiss.SearchParameters(sel=sel)
+        else:  # matches are spread thinly over the lists: probe more of them
+            boost = max(1, self.index.ntotal // max(len(rows), 1))
+            params = faiss.SearchParametersIVF(sel=sel, nprobe=min(ivf.nlist, self.nprobe * boost))
+        return self.index.search(vecs, k, params=params)
+
+    def search_vectors(self, vecs, k: int, filter=None) -> list[list[tuple[Document, float]]]:
+        vecs, f = _normalize(vecs), as_filter(filter)
+        with tracing.span("vector.search", k=k, queries=len(vecs)):
+            if f is None:
+                scores, rows = self.index.search(vecs, k)
+            else:
+                subset = self.rows_matching(f)
+                if not subset: return [[] for _ in range(len(vecs))]
+                scores, rows = self._search_subset(vecs, k, subset)
+        wanted = sorted({int(r) for r in rows.ravel() if r >= 0})
+        with tracing.span("docstore.fetch", rows=len(wanted)):
+            docs = self._docs(wanted) if wanted else {}
+        return [[(docs[int(r)], float(s)) for s, r in zip(srow, rrow) if r >= 0]
+                for srow, rrow in zip(scores, rows)]
+
+    def search_with_scores(self, query: str, k: int = 4, filter=None) -> list[tuple[Document, float]]:
+        return self.search_vectors([embed_query(self.embeddings, query)], k, filter)[0]
+
+    def search_many_with_scores(self, queries: list[str], k: int = 4, filter=None) -> list[list[tuple[Document, float]]]:
+        return self.search_vectors(embed_queries(self.embeddings, queries), k, filter) if queries else []
@@ -0,0 +1,180 @@
+# rag/bm25.py
+"""Compact on-disk BM25 index for the lexical half of hybrid search.
+
+Postings keep raw term frequencies and each doc's length is stored, so the
+index can be updated in place: `update()` tokenizes only the upserted and
+deleted chunks instead of re-reading the whole vector store. The BM25 weight
+(idf * saturated tf with length normalisation) is computed at query time
+from per-doc norms cached on load. The file itself is still rewritten whole
+on save.
+"""
+from __future__ import annotations
+import bisect, gzip, heapq, json, math, os, re
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+BM25_FILE = "bm25.json.gz"
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+K1, B = 1.5, 0.75
+COMPACT_AT = 0.25  # rebuild once this share of rows are deleted tombstones
+PROBE_RATIO = 8    # a filter this many times smaller than a posting list is looked up row by row
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    def __init__(self, docs: list, postings: dict, lens: list[int], k1: float = K1, b: float = B):
+        self.docs = docs          # [[id, page_content, metadata] or None (deleted), ...]
+        self.postings = postings  # term -> [[doc_idx, term frequency], ...]
+        self.lens = lens          # tokens per doc, 0 for deleted rows
+        self.k1, self.b = k1, b
+        self._by_meta = None      # (field, value) -> {doc_idx}, built on the first filtered search
+        self._rows = None         # id -> doc_idx, built on the first update
+        self._stats()
+
+    def _stats(self):
+        live = [n for d, n in zip(self.docs, self.lens) if d is not None]
+        self.n = len(live)
+        avgdl = (sum(live) / len(live)) if live else 1.0
+        self._norm = [self.k1 * (1 - self.b + self.b * n / (avgdl or 1.0)) for n in self.lens]
+
+    @classmethod
+    def build(cls, chunks: list[Document], ids: list[str] | None = None, k1: float = K1, b: float = B):
+        ids = ids or [getattr(d, "id", None) or str(i) for i, d in enumerate(chunks)]
+        idx = cls([], {}, [], k1, b)
+        idx._add(list(zip(ids, chunks)))
+        idx._stats()
+        return idx
+
+    def _add(self, items: list[tuple[str, Document]]):
+        for doc_id, d in items:
+            i = len(self.docs)
+            tf = Counter(tokenize(d.page_content))
+            for t, f in tf.items(): self.postings.setdefault(t, []).append([i, f])
+            self.docs.append([doc_id, d.page_content, d.metadata])
+            self.lens.append(sum(tf.values()))
+            if self._rows is not None: self._rows[doc_id] = i
+
+    def update(self, upserts: Iterable[tuple[str, Document]] = (), deletes: Iterable[str] = ()):
+        """Replace / add the (id, chunk) pairs in `upserts` and drop `deletes`, touching
+        only the posting lists of the terms involved."""
+        upserts = list(upserts)
+        if self._rows is None:
+            self._rows = {d[0]: i for i, d in enumerate(self.docs) if d is not None}
+        gone = {self._rows.pop(x) for x in {*deletes, *(x for x, _ in upserts)} if x in self._rows}
+        for t in {t for i in gone for t in tokenize(self.docs[i][1])}:
+            kept = [p for p in self.postings[t] if p[0] not in gone]
+            if kept: self.postings[t] = kept
+            else: del self.postings[t]
+        for i in gone:
+            self.docs[i], self.lens[i] = None, 0
+        self._add(upserts)
+        self._by_meta = None
+        if self.docs.count(None) > COMPACT_AT * len(self.docs): self._compact()
+        self._stats()
+
+    def _compact(self):
+        from langchain_core.documents import Document
+        live = [(d[0], Document(page_content=d[1], metadata=d[2])) for d in self.docs if d is not None]
+        self.docs, self.postings, self.lens, self._rows = [], {}, [], None
+        self._add(live)
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"docs": self.docs, "postings": self.postings, "lens": self.lens, "k1": self.k1, "b": self.b},
+                      f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if "lens" not in data:  # older files stored final weights; rebuild from their texts
+            from langchain_core.documents import Document
+            return cls.build([Document(page_content=t, metadata=m) for _, t, m in data["docs"]],
+                             [i for i, _, _ in data["docs"]])
+        return cls(data["docs"], data["postings"], data["lens"], data["k1"], data["b"])
+
+    def rows_matching(self, f) -> set[int]:
+        """Doc indices whose metadata satisfies a rag.filters.SearchFilter."""
+        if self._by_meta is None:
+            from rag.filters import META_KEYS
+            by_meta = defaultdict(set)
+            for i, d in enumerate(self.docs):
+                if d is None: continue
+                meta = d[2]
+                for field in META_KEYS:
+                    if meta.get(field): by_meta[(field, str(meta[field]))].add(i)
+            self._by_meta = by_meta
+        rows = None
+        for field, vals in f.fields.items():
+            found = set().union(*(self._by_meta.get((field, v), ()) for v in vals))
+            rows = found if rows is None else rows & found
+        return rows or set()
+
+    def _matching(self, postings: list, allowed: set[int], rows: list[int]):
+        """(doc_idx, tf) of `postings` restricted to the allowed rows. Postings are
+        sorted by doc_idx, so a small filter is resolved by binary search per row
+        without walking the whole list."""
+        if len(rows) * PROBE_RATIO >= len(postings):
+            return [p for p in postings if p[0] in allowed]
+        out, lo = [], 0
+        for i in rows:
+            lo = bisect.bisect_left(postings, i, lo, key=lambda p: p[0])
+            if lo == len(postings): break
+            if postings[lo][0] == i: out.append(postings[lo])
+        return out
+
+    def search(self, query: str, k: int = 4, filter=None) -> list[tuple[Document, float]]:
+        """Top `k` (chunk, score); with a filter only the matching rows are scored."""
+        scores: dict[int, float] = defaultdict(float)
+        allowed = self.rows_matching(filter) if filter else None
+        if allowed is not None and not allowed: return []
+        rows = sorted(allowed) if allowed is not None else None
+        k1, norm = self.k1 + 1, self._norm
+        for t in set(tokenize(query)):
+            postings = self.postings.get(t)
+            if not postings: continue
+            # idf over the whole collection, so scores don't depend on the filter
+            idf = math.log(1 + (self.n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, f in postings if rows is None else self._matching(postings, allowed, rows):
+                scores[i] += idf * f * k1 / (f + norm[i])
+        best = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+        return [(self.document(i), s) for i, s in best]
+
+    def document(self, i: int) -> Document:
+        from langchain_core.documents import Document
+        doc_id, text, meta = self.docs[i]
+        return Document(id=doc_id, page_content=text, metadata=meta)
+
+_LOADED: dict = {}
+
+def load_bm25(path: str) -> BM25Index | None:
+    """Load lazily and keep in memory until the file on disk changes."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    hit = _LOADED.get(path)
+    if hit and hit[0] == mtime: return hit[1]
+    idx = BM25Index.load(path)
+    _LOADED[path] = (mtime, idx)
+    return idx
+
+def build_from_store(vs, path: str):
+    """(Re)build the lexical index from everything in a Chroma collection."""
+    from langchain_core.documents import Document
+    data = vs.get(include=["documents", "metadatas"])
+    chunks = [Document(page_content=t, metadata=m or {}) for t, m in zip(data["documents"], data["metadatas"])]
+    BM25Index.build(chunks, data["ids"]).save(path)
+
+def update_file(vs, path: str, upserts: list[tuple[str, Document]], deletes: list[str]):
+    """Apply one sync's changes to the index at `path`; a missing file is built from `vs` once."""
+    if not os.path.exists(path): return build_from_store(vs, path)
+    idx = BM25Index.load(path)
+    idx.update(upserts, deletes)
+    idx.save(path)
@@ -1,31 +1,132 @@
 # rag/chunking.py
-import re
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+import bisect, hashlib, re
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from rag import tracing
+from rag.bm25 import BM25Index
+from rag.filters import label_id
+from rag.index import source_key
 
+CHUNK_OVERLAP = 150
+HEAD_SCAN = 600  # chars of a document's first chunk searched for its labels
 SPLITTER = RecursiveCharacterTextSplitter(
-    chunk_size=1200, chunk_overlap=150,
+    chunk_size=1200, chunk_overlap=CHUNK_OVERLAP,
     separators=["\n## ", "\n### ", "\n\n", "\n", " "]
 )
 
 LEVEL_RE = re.compile(r"(Level\s+\d+[:\-]?\s*[A-Za-z0-9 \-]*)", re.IGNORECASE)
 SECTION_RE = re.compile(r"(Section\s+\d+[:\-]?\s*[A-Za-z0-9 \-]*)", re.IGNORECASE)
+HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*$", re.MULTILINE)
+
+class Outline:
+    """Level / Section / markdown heading positions of one document, parsed once."""
+
+    def __init__(self, text: str):
+        self._marks = {}
+        low = text.lower()  # cheap substring checks skip the regex scan on most pages
+        for name, rx, probe in (("level", LEVEL_RE, "level"), ("section", SECTION_RE, "section"),
+                                ("heading", HEADING_RE, "#")):
+            hits = [(m.start(), m.group(1).strip()) for m in rx.finditer(text)] if probe in low else []
+            self._marks[name] = ([p for p, _ in hits], [t for _, t in hits])
+
+    def _at(self, name: str, pos: int):
+        starts, labels = self._marks[name]
+        i = bisect.bisect_right(starts, pos) - 1
+        return (starts[i], labels[i]) if i >= 0 else (-1, None)
+
+    def at(self, pos: int, inherited: dict | None = None) -> dict:
+        """Labels in effect at character offset `pos`; `inherited` holds those
+        in effect at the end of the previous page of the same source."""
+        inherited = inherited or {}
+        level_pos, level = self._at("level", pos)
+        section_pos, section = self._at("section", pos)
+        if level is None:
+            level, section = inherited.get("level"), section or inherited.get("section")
+        elif section_pos < level_pos:
+            section = None  # a new Level starts a new set of sections
+        heading = self._at("heading", pos)[1] or inherited.get("heading")
+        return {k: v for k, v in (("level", level), ("section", section), ("heading", heading)) if v}
+
+    def head(self, limit: int = HEAD_SCAN, inherited: dict | None = None) -> dict:
+        """Labels for a document's first chunk: the first Level / Section / heading
+        within its first `limit` chars, else what was in effect before it."""
+        labels = self.at(0, inherited)
+        found = {}
+        for name in ("level", "section", "heading"):
+            starts, names = self._marks[name]
+            if starts and starts[0] < limit: found[name] = names[0]
+        if "level" in found and "section" not in found: labels.pop("section", None)
+        labels.update(found)
+        return labels
+
+def _chunk_uid(meta: dict, index: int) -> str:
+    # source_key: loaders give every video / repo the same "source"
+    key = f"{source_key(meta)}\0{meta.get('page')}\0{index}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def _label_ids(meta: dict) -> dict:
+    # normalised ids the level / section filters match on (rag.filters)
+    for name in ("level", "section"):
+        if meta.get(name): meta[f"{name}_id"] = label_id(meta[name])
+        else: meta.pop(f"{name}_id", None)
+    return meta
+
+def _reference(meta: dict) -> str:
+    if "level" not in meta and "section" not in meta and "heading" in meta:
+        return meta["heading"]
+    return f"{meta.get('level','Level ?')}, {meta.get('section','Section ?')}"
 
 def enrich_metadata(doc: Document, idx: int) -> Document:
-    text = doc.page_content[:600]  # scan head
+    # single-chunk variant: labels from the chunk head only
+    text = doc.page_content[:HEAD_SCAN]  # scan head
     meta = dict(doc.metadata) if doc.metadata else {}
     le = LEVEL_RE.search(text)
     se = SECTION_RE.search(text)
     if le: meta["level"] = le.group(1).strip()
     if se: meta["section"]  = se.group(1).strip()
-    meta["chunk_id"] = idx
-    meta["reference_text"] = f"{meta.get('level','Level ?')}, {meta.get('section','Section ?')}"
+    _label_ids(meta)
+    meta["chunk_index"] = idx
+    meta["chunk_id"] = _chunk_uid(meta, idx)
+    meta["reference_text"] = _reference(meta)
     return Document(page_content=doc.page_content, metadata=meta)
 
-def split_and_tag(docs: list[Document]) -> list[Document]:
-    chunks = []
+def split_and_tag(docs: list[Document], bm25_path: str | None = None) -> list[Document]:
+    """Split many documents in one pass and label every chunk from its document's outline.
+
+    Chunks get `chunk_index` (position within the document), `start_index`,
+    a globally unique `chunk_id`, and the Level/Section/heading in effect
+    where the chunk's own text begins (past the overlap with its predecessor),
+    with `level_id` / `section_id` for filtering.
+    A document's first chunk takes the first labels in its head (HEAD_SCAN chars).
+    Labels carry over between consecutive pages of the same document (source_key).
+    """
+    with tracing.span("chunking.split_and_tag", docs=len(docs)) as sp:
+        chunks = _split(docs)
+        if sp is not None: sp["chunks"] = len(chunks)
+    if bm25_path:  # lexical index for rag.retrieval.hybrid_top_k
+        BM25Index.build(chunks).save(bm25_path)
+    return chunks
+
+def _split(docs: list[Document]) -> list[Document]:
+    chunks, carry, carry_src = [], {}, None
     for d in docs:
-        parts = SPLITTER.split_documents([d])
-        for i, p in enumerate(parts):
-            chunks.append(enrich_metadata(p, i))
+        text = d.page_content
+        outline = Outline(text)
+        base = d.metadata or {}
+        src = source_key(base)
+        if src != carry_src:
+            carry, carry_src = {}, src
+        start = 0
+        for i, part in enumerate(SPLITTER.split_text(text)):
+            found = text.find(part, start)
+            pos = found if found >= 0 else start
+            start = max(pos + 1, pos + len(part) - CHUNK_OVERLAP)  # next chunk overlaps at most this much
+            meta = dict(base)
+            if i == 0: meta.update(outline.head(min(HEAD_SCAN, len(part)), carry))
+            else: meta.update(outline.at(pos + min(CHUNK_OVERLAP, len(part) - 1), carry))
+            _label_ids(meta)
+            meta.update(chunk_index=i, start_index=pos, chunk_id=_chunk_uid(base, i))
+            meta["reference_text"] = _reference(meta)
+            chunks.append(Document(page_content=part, metadata=meta))
+        carry = outline.at(len(text), carry)
     return chunks
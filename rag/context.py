@@ -0,0 +1,123 @@
+# rag/context.py
+"""Context packing: turn ranked chunks into a compact prompt context.
+
+Near-duplicate chunks (the same material indexed via scr/loader and
+rag/loaders, overlapping re-ingests) are dropped with MinHash, neighbouring
+chunks of one source are merged back together without their 150-char
+overlap, and blocks are added by relevance until the token budget is spent.
+"""
+from __future__ import annotations
+import re, zlib
+from typing import TYPE_CHECKING
+import numpy as np
+from rag import registry
+from rag.index import source_key
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+CONTEXT_TOKENS = 1200     # prompt budget for retrieved context
+DUP_THRESHOLD = 0.8       # estimated Jaccard similarity above which a chunk is a duplicate
+NUM_PERM, SHINGLE = 64, 5
+MAX_OVERLAP = 400         # chars searched when stitching neighbours (splitter overlap is 150)
+MIN_OVERLAP = 20          # shorter shared text is coincidence ("...and" + "data..."), not splitter overlap
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # not installed / BPE file not downloadable (offline)
+        return None
+
+def count_tokens(text: str) -> int:
+    enc = registry.get("tiktoken", _encoding)
+    return len(enc.encode(text, disallowed_special=())) if enc else len(text) // 4 + 1
+
+def minhash(text: str) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    grams = {" ".join(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1))}
+    x = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+    # uint64 wraps instead of taking mod p; fine for similarity estimates
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0)
+
+def drop_near_duplicates(docs: list[Document], threshold: float = DUP_THRESHOLD) -> list[Document]:
+    """Keep the first (best ranked) of every group of near-identical chunks."""
+    kept, sigs = [], []
+    for d in docs:
+        sig = minhash(d.page_content)
+        if any(float(np.mean(sig == s)) >= threshold for s in sigs): continue
+        kept.append(d); sigs.append(sig)
+    return kept
+
+def _span_key(d: Document):
+    # source_key, not "source": every YouTube video / GitHub repo shares source "youtube" / "github"
+    m = d.metadata
+    return source_key(m), m.get("page")
+
+def _index(d: Document):
+    # chunk_index from rag.chunking; stores built before it carried a per-doc int chunk_id
+    m = d.metadata
+    i = m.get("chunk_index", m.get("chunk_id"))
+    return i if isinstance(i, int) else None
+
+def _word_edge(left: str, right: str) -> bool:
+    return not (left[-1:].isalnum() and right[:1].isalnum())
+
+def _stitch(a: str, b: str) -> str:
+    """Join neighbouring chunks, dropping the overlap the splitter repeated.
+
+    The overlap is whole words, so it must be at least MIN_OVERLAP chars and
+    start and end on word boundaries; otherwise the chunks are just joined."""
+    for n in range(min(len(a), len(b), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:n]) and _word_edge(a[:-n], b) and _word_edge(b[:n], b[n:]):
+            return a + b[n:]
+    return a + "\n" + b
+
+def merge_adjacent(docs: list[Document]) -> list[Document]:
+    """Merge chunks with consecutive chunk_index from the same document/page, keeping rank order."""
+    from langchain_core.documents import Document
+    groups: dict = {}
+    for rank, d in enumerate(docs):
+        groups.setdefault(_span_key(d), []).append((rank, d))
+    blocks = []
+    for members in groups.values():
+        members.sort(key=lambda rd: (_index(rd[1]) is None, _index(rd[1]) or 0))
+        run = [members[0]]
+        for rd in members[1:]:
+            prev, cur = _index(run[-1][1]), _index(rd[1])
+            if prev is not None and cur == prev + 1:
+                run.append(rd); continue
+            blocks.append(run); run = [rd]
+        blocks.append(run)
+    out = []
+    for run in blocks:
+        rank = min(r for r, _ in run)
+        head = run[0][1]
+        if len(run) == 1:
+            out.append((rank, head)); continue
+        text = head.page_content
+        for _, d in run[1:]: text = _stitch(text, d.page_content)
+        out.append((rank, Document(id=head.id, page_content=text, metadata=head.metadata)))
+    return [d for _, d in sorted(out, key=lambda rd: rd[0])]
+
+def pack_context(docs: list[Document], budget: int = CONTEXT_TOKENS, max_blocks: int | None = None) -> list[Document]:
+    """Deduplicate, merge neighbours, then fill `budget` tokens by relevance.
+
+    `docs` must be ranked best first; blocks that do not fit are skipped so
+    smaller, lower-ranked ones can still use the remaining budget.
+    """
+    picked, used = [], 0
+    for d in merge_adjacent(drop_near_duplicates(docs)):
+        n = count_tokens(d.page_content)
+        if used + n > budget: continue
+        picked.append(d); used += n
+        if max_blocks and len(picked) >= max_blocks: break
+    if not picked and docs:  # a single oversized chunk still beats an empty context
+        picked = [docs[0]]
+    return picked
@@ -0,0 +1,150 @@
+# rag/embed_cache.py
+import hashlib, re, sqlite3, threading
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIR = ".cache/embeddings"
+
+class CachedEmbeddings(Embeddings):
+    """Disk-backed cache in front of any LangChain embeddings object.
+
+    Vectors live in a memory-mapped float32 matrix (one row per entry), the
+    key -> row index in SQLite. Keys are model name + text hash, so several
+    models can share a cache dir. When `max_entries` is reached the least
+    recently used rows are overwritten. The matrix's row count is kept in the
+    meta table: reopening with a larger `max_entries` grows the file, with a
+    smaller one drops the entries in rows past the new end.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: str | None = None,
+                 cache_dir: str = CACHE_DIR, max_entries: int = 100_000):
+        self.inner = inner
+        self.model_name = model_name or getattr(inner, "model_name", None) or getattr(inner, "model", "default")
+        self.max_entries = max_entries
+        self.dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.dir / "index.sqlite", check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER, used INTEGER);
+            CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+        """)
+        self._vecs = None
+        dim = self._meta("dim")
+        if dim: self._open(dim)
+        self._tick = self._meta("tick") or 0
+
+    # --- storage ---
+    def _meta(self, name):
+        row = self._db.execute("SELECT value FROM meta WHERE name=?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def _open(self, dim: int):
+        path = self.dir / "vectors.f32"
+        row = dim * np.dtype(np.float32).itemsize
+        # caches written before the capacity was recorded: the file size tells
+        capacity = self._meta("capacity") or (path.stat().st_size // row if path.exists() else 0)
+        if capacity > self.max_entries:
+            self._db.execute("DELETE FROM entries WHERE slot >= ?", (self.max_entries,))
+            self._set_meta("next_slot", min(self._meta("next_slot") or 0, self.max_entries))
+        if capacity != self.max_entries or not path.exists():
+            with open(path, "ab") as f: f.truncate(self.max_entries * row)  # grown rows read as zeros
+            self._set_meta("capacity", self.max_entries)
+            self._db.commit()
+        self._vecs = np.memmap(path, dtype=np.float32, mode="r+", shape=(self.max_entries, dim))
+
+    def _key(self, text: str, kind: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _alloc(self, n: int, keep: tuple = ()) -> list[int]:
+        nxt = self._meta("next_slot") or 0
+        fresh = list(range(nxt, min(nxt + n, self.max_entries)))
+        self._set_meta("next_slot", nxt + len(fresh))
+        if len(fresh) == n: return fresh
+        # full: evict least recently used rows (other than `keep`) and reuse their slots
+        victims = self._db.execute(
+            f"SELECT key, slot FROM entries WHERE key NOT IN ({','.join('?' * len(keep))}) ORDER BY used LIMIT ?",
+            (*keep, n - len(fresh))).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key=?", [(k,) for k, _ in victims])
+        return fresh + [s for _, s in victims]
+
+    def _get(self, keys: list[str]) -> dict[str, np.ndarray]:
+        if self._vecs is None or not keys: return {}
+        found = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(part))})", part).fetchall()
+            found.update({k: self._vecs[s] for k, s in rows})
+        if found:
+            self._tick += 1
+            self._db.executemany("UPDATE entries SET used=? WHERE key=?", [(self._tick, k) for k in found])
+        return found
+
+    def _put(self, keys: list[str], vectors):
+        arr = np.asarray(vectors, dtype=np.float32)
+        if self._vecs is None:
+            self._set_meta("dim", arr.shape[1])
+            self._open(arr.shape[1])
+        arr = arr[-self.max_entries:]; keys = keys[-self.max_entries:]
+        # a key another thread stored since our miss keeps its slot (a new one would be orphaned)
+        have = dict(self._db.execute(
+            f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(keys))})", keys).fetchall())
+        fresh = iter(self._alloc(sum(k not in have for k in keys), tuple(have)))
+        slots = [have[k] if k in have else next(fresh) for k in keys]
+        self._vecs[slots] = arr
+        self._vecs.flush()
+        self._tick += 1
+        self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                             [(k, s, self._tick) for k, s in zip(keys, slots)])
+
+    # --- Embeddings interface ---
+    def _embed(self, texts: list[str], kind: str, compute) -> list[list[float]]:
+        keys = [self._key(t, kind) for t in texts]
+        with self._lock:
+            hits = self._get(keys)
+            out = {k: v.tolist() for k, v in hits.items()}
+            self._set_meta("tick", self._tick)
+            self._db.commit()
+        missing = {k: t for k, t in zip(keys, texts) if k not in out}  # also dedups repeated texts
+        if missing:
+            vecs = compute(list(missing.values()))
+            with self._lock:
+                self._put(list(missing), vecs)
+                self._set_meta("tick", self._tick)
+                self._db.commit()
+            out.update(zip(missing, (list(map(float, v)) for v in vecs)))
+        return [out[k] for k in keys]
+
+    def cached(self, texts: list[str], compute) -> list[list[float]]:
+        """Like embed_documents, but cache misses are encoded by `compute(texts)`."""
+        return self._embed(list(texts), "doc", compute)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(list(texts), "doc", self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "query", lambda ts: [self.inner.embed_query(ts[0])])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Many queries; misses go through query_vectors (one batch where the model allows)."""
+        return self._embed(list(texts), "query", lambda ts: query_vectors(self.inner, ts))
+
+def _symmetric(embeddings) -> bool:
+    # langchain_community's HuggingFaceEmbeddings.embed_query is embed_documents([text])[0];
+    # anything else may add a query prefix / instruction (E5, BGE, instruct models)
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+    except ImportError:
+        return False
+    return type(embeddings).embed_query is HuggingFaceEmbeddings.embed_query
+
+def query_vectors(embeddings, texts: list[str]) -> list[list[float]]:
+    """embed_query for each text, as one embed_documents batch when that is the same thing."""
+    if _symmetric(embeddings): return embeddings.embed_documents(list(texts))
+    return [embeddings.embed_query(t) for t in texts]
@@ -0,0 +1,86 @@
+# rag/embedder.py
+"""Embedding stage for index builds.
+
+Texts are sorted by length before batching so each batch pads to a similar
+length, then encoded either in-process (through the embedding cache) or by
+`workers` processes, each with its own model copy and a pinned torch thread
+count. Vectors come back in input order.
+
+Worker pools are kept between calls, so an incremental ingest that flushes
+many batches spawns processes and loads the model once; callers that are
+done embedding call `shutdown_pools()`.
+"""
+import atexit, os, threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+BATCH_SIZE = 64
+TASK_BATCHES = 8  # batches per worker task, amortises IPC
+
+_MODEL = None
+_POOLS: dict = {}  # (model, workers, threads) -> ProcessPoolExecutor
+_POOLS_LOCK = threading.Lock()
+
+def _init_worker(model_name: str, threads: int):
+    global _MODEL
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    from sentence_transformers import SentenceTransformer
+    _MODEL = SentenceTransformer(model_name, device="cpu")
+
+def _encode(texts: list[str], batch_size: int) -> np.ndarray:
+    # same preprocessing as HuggingFaceEmbeddings.embed_documents
+    texts = [t.replace("\n", " ") for t in texts]
+    return _MODEL.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32)
+
+def _pool(model_name: str, workers: int, threads: int) -> ProcessPoolExecutor:
+    key = (model_name, workers, threads)
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_name, threads))
+        return _POOLS[key]
+
+def shutdown_pools():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools: pool.shutdown()
+
+atexit.register(shutdown_pools)
+
+def _encode_parallel(texts: list[str], model_name: str, batch_size: int, workers: int, threads: int | None):
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    step = batch_size * TASK_BATCHES
+    tasks = [texts[i:i + step] for i in range(0, len(texts), step)]
+    pool = _pool(model_name, workers, threads)
+    return np.concatenate(list(pool.map(_encode, tasks, [batch_size] * len(tasks))))
+
+def embed_texts(texts: list[str], embeddings, model_name: str, batch_size: int | None = None,
+                workers: int = 1, threads: int | None = None) -> np.ndarray:
+    """Embed `texts` with length-sorted batches; returns a float32 matrix in input order.
+
+    `embeddings` is the in-process model (usually rag.registry.embeddings()). If it is a
+    CachedEmbeddings, cached vectors are reused and only misses are encoded.
+    """
+    if not texts: return np.zeros((0, 0), dtype=np.float32)
+    batch_size = batch_size or BATCH_SIZE
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    embed = getattr(embeddings, "inner", embeddings).embed_documents
+
+    def compute(batch_texts: list[str]):
+        if workers > 1:
+            return _encode_parallel(batch_texts, model_name, batch_size, workers, threads)
+        out = []
+        for i in range(0, len(batch_texts), batch_size):
+            out += embed(batch_texts[i:i + batch_size])
+        return out
+
+    sorted_texts = [texts[i] for i in order]
+    if hasattr(embeddings, "cached"):
+        vecs = embeddings.cached(sorted_texts, compute)
+    else:
+        vecs = compute(sorted_texts)
+    out = np.empty((len(texts), len(vecs[0])), dtype=np.float32)
+    out[order] = np.asarray(vecs, dtype=np.float32)
+    return out
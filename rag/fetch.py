@@ -0,0 +1,165 @@
+# rag/fetch.py
+"""Shared HTTP layer for the GitHub / YouTube loaders.
+
+One pooled session, an on-disk response cache that revalidates with
+ETag / If-None-Match (a 304 does not count against GitHub's rate limit),
+and exponential backoff when GitHub or YouTube throttle us (429, or 403
+with the rate-limit headers), answer 5xx, time out or drop the connection.
+`first_ok` probes candidate URLs concurrently. The loaders and the repo
+evaluator both go through here; base URLs come from GITHUB_API_URL /
+GITHUB_RAW_URL so everything can run against a local stub server.
+
+Responses are cached per URL, Accept header and credentials. Only URLs the
+caller marks immutable (pinned to a commit SHA) fall back to a stale copy
+when every attempt fails; for anything else, e.g. /commits/HEAD, an old
+answer would be a wrong one.
+"""
+import hashlib, json, os, random, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from rag import registry, tracing
+
+API_BASE = os.getenv("GITHUB_API_URL", "https://api.github.com")
+RAW_BASE = os.getenv("GITHUB_RAW_URL", "https://raw.githubusercontent.com")
+CACHE_PATH = ".cache/http.sqlite"
+POOL_SIZE = 16
+RETRIES, BACKOFF, MAX_BACKOFF = 4, 0.5, 30.0
+CACHED_STATUS = (200, 404)
+
+class Cached:
+    """The bits of a requests.Response callers use, for fresh and cached answers alike."""
+    def __init__(self, url: str, status_code: int, content: bytes, headers: dict, from_cache: bool = False):
+        self.url, self.status_code, self.content = url, status_code, content
+        self.headers, self.from_cache = headers, from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+def _rate_limited(r: requests.Response) -> bool:
+    if r.status_code == 429: return True
+    return r.status_code == 403 and (r.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in r.headers)
+
+def _wait(r: requests.Response | None, attempt: int) -> float:
+    if r is not None:
+        if r.headers.get("Retry-After", "").isdigit():
+            return min(float(r.headers["Retry-After"]), MAX_BACKOFF)
+        if r.headers.get("X-RateLimit-Reset", "").isdigit():
+            return min(max(float(r.headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1, MAX_BACKOFF)
+    return min(BACKOFF * 2 ** attempt, MAX_BACKOFF) * (0.5 + random.random() / 2)
+
+class Fetcher:
+    def __init__(self, cache_path: str = CACHE_PATH, pool_size: int = POOL_SIZE, token: str | None = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self.token = token or os.getenv("GH_TOKEN") or os.getenv("GITHUB_TOKEN")
+        self.pool_size = pool_size
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY, status INTEGER, etag TEXT, last_modified TEXT,
+            headers TEXT, body BLOB, fetched REAL)""")
+        self._lock = threading.Lock()
+
+    # --- cache ---
+    def cached(self, key: str, url: str | None = None) -> tuple[Cached, dict] | None:
+        with self._lock:
+            row = self._db.execute("SELECT status, etag, last_modified, headers, body, fetched FROM responses "
+                                   "WHERE url=?", (key,)).fetchone()
+        if row is None: return None
+        status, etag, modified, headers, body, fetched = row
+        return Cached(url or key, status, body, json.loads(headers), True), {"etag": etag, "last_modified": modified,
+                                                                             "fetched": fetched}
+
+    def store(self, key: str, status: int, body: bytes, headers: dict | None = None):
+        headers = headers or {}
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (key, status, headers.get("ETag"), headers.get("Last-Modified"),
+                              json.dumps(dict(headers)), body, time.time()))
+            self._db.commit()
+
+    def _touch(self, key: str):
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched=? WHERE url=?", (time.time(), key))
+            self._db.commit()
+
+    # --- HTTP ---
+    def _headers(self, url: str, headers: dict | None) -> dict:
+        out = dict(headers or {})
+        if self.token and url.startswith(API_BASE): out.setdefault("Authorization", f"Bearer {self.token}")
+        return out
+
+    @staticmethod
+    def _key(url: str, send: dict) -> str:
+        # one URL has several representations (Accept), and what a token may see
+        # must not be served to a fetcher without it
+        accept, auth = send.get("Accept", ""), send.get("Authorization")
+        if not accept and not auth: return url
+        who = hashlib.sha1(auth.encode()).hexdigest()[:12] if auth else ""
+        return f"{url}\0{accept}\0{who}"
+
+    def get(self, url: str, headers: dict | None = None, max_age: float = 0, timeout: float = 30,
+            cache: bool = True, immutable: bool = False) -> Cached:
+        """GET through the cache. Within `max_age` seconds the stored answer is
+        returned without a request; after that it is revalidated by ETag.
+        cache=False keeps retries / backoff but neither reads nor stores a copy
+        (for bodies the caller caches itself, e.g. blobs by SHA). immutable=True
+        (the URL is pinned to a commit SHA) allows serving the stored copy when
+        every attempt fails; otherwise the failure is returned / raised."""
+        send = self._headers(url, headers)
+        key = self._key(url, send)
+        hit = self.cached(key, url) if cache else None
+        if hit and time.time() - hit[1]["fetched"] < max_age:
+            tracing.incr("fetch_cache_fresh")
+            return hit[0]
+        with tracing.span("fetch.get", url=url):
+            return self._get(url, key, send, hit, timeout, cache, immutable)
+
+    def _get(self, url: str, key: str, send: dict, hit, timeout: float, cache: bool = True,
+             immutable: bool = False) -> Cached:
+        if hit and hit[1]["etag"]: send["If-None-Match"] = hit[1]["etag"]
+        elif hit and hit[1]["last_modified"]: send["If-Modified-Since"] = hit[1]["last_modified"]
+        stale = hit[0] if hit and immutable else None
+        r = None
+        for attempt in range(RETRIES + 1):
+            try:
+                r = self.session.get(url, headers=send, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == RETRIES:
+                    if stale: return stale  # unreachable, but the content cannot have changed
+                    raise
+                r = None
+            else:
+                if not (_rate_limited(r) or r.status_code >= 500): break
+            if attempt < RETRIES:
+                tracing.incr("fetch_retries")
+                time.sleep(_wait(r, attempt))
+        if r.status_code == 304 and hit:
+            tracing.incr("fetch_not_modified")
+            self._touch(key)
+            return hit[0]
+        if cache and r.status_code in CACHED_STATUS:
+            self.store(key, r.status_code, r.content, r.headers)
+        elif stale:
+            return stale  # still throttled / server error
+        return Cached(url, r.status_code, r.content, dict(r.headers))
+
+    def first_ok(self, urls: list[str], headers: dict | None = None, max_age: float = 0) -> Cached | None:
+        """Fetch candidate URLs concurrently; the first successful one in list order wins."""
+        with ThreadPoolExecutor(min(len(urls), self.pool_size) or 1) as pool:
+            results = list(pool.map(lambda u: self.get(u, headers, max_age), urls))
+        return next((r for r in results if r.ok and r.content.strip()), None)
+
+def default_fetcher() -> Fetcher:
+    return registry.get("fetcher", Fetcher)
@@ -0,0 +1,59 @@
+# rag/filters.py
+"""Metadata filters for scoped searches ("only YouTube sessions", "only Level 2").
+
+A SearchFilter is applied *before* similarity search wherever the backend
+allows it: as a Chroma `where` clause, as a faiss IDSelector over the rows
+that match in FaissBackend's metadata table, and as the only rows the
+BM25 index scores. Each field takes one value or a list of alternatives; fields
+are ANDed together.
+
+`level` and `section` match on the number alone: chunks store the full label
+("Level 2: Retrieval") plus a normalised `level_id` ("2") written at chunking
+time, and the filter accepts "Level 2", "level 2: anything", "2" or 2.
+"""
+from __future__ import annotations
+import re
+
+FIELDS = ("type", "level", "section", "repo", "video_id", "source")
+ID_FIELDS = {"level": "level_id", "section": "section_id"}  # filter field -> metadata key it matches
+META_KEYS = tuple(ID_FIELDS.get(k, k) for k in FIELDS)      # metadata keys backends index for filtering
+
+Value = str | int | list[str | int] | tuple[str | int, ...] | None
+
+_NUMBER = re.compile(r"\d+")
+
+def label_id(label) -> str:
+    """The number in a Level / Section label ("Level 2: Retrieval", "2", 2 -> "2"); else the label lowercased."""
+    label = str(label).strip()
+    m = _NUMBER.search(label)
+    return str(int(m.group())) if m else label.lower()
+
+class SearchFilter:
+    def __init__(self, *, type: Value = None, level: Value = None, section: Value = None,
+                 repo: Value = None, video_id: Value = None, source: Value = None):
+        given = dict(type=type, level=level, section=section, repo=repo, video_id=video_id, source=source)
+        self.fields: dict[str, tuple[str, ...]] = {}  # metadata key -> accepted values
+        for k, v in given.items():
+            if v is None: continue
+            vals = (v,) if isinstance(v, (str, int)) else tuple(v)
+            if k in ID_FIELDS: self.fields[ID_FIELDS[k]] = tuple(dict.fromkeys(label_id(x) for x in vals))
+            else: self.fields[k] = tuple(str(x) for x in vals)
+
+    def __bool__(self) -> bool:
+        return bool(self.fields)
+
+    def __repr__(self) -> str:
+        return f"SearchFilter({', '.join(f'{k}={v!r}' for k, v in self.fields.items())})"
+
+    def matches(self, meta: dict) -> bool:
+        return all(meta.get(k) in vals for k, vals in self.fields.items())
+
+    def to_chroma(self) -> dict | None:
+        clauses = [{k: vals[0]} if len(vals) == 1 else {k: {"$in": list(vals)}} for k, vals in self.fields.items()]
+        if not clauses: return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def as_filter(f) -> SearchFilter | None:
+    """Accept a SearchFilter, a plain dict of fields, or None."""
+    if f is None or isinstance(f, SearchFilter): return f or None
+    return SearchFilter(**f) or None
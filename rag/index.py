@@ -1,14 +1,230 @@
 # rag/index.py
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain.schema import Document
+from __future__ import annotations
 from pathlib import Path
+from rag import registry, tracing
+from rag.registry import EMB_MODEL
+from rag.bm25 import BM25_FILE, build_from_store, update_file
+from collections import Counter
+from itertools import groupby
+from typing import Iterable, TYPE_CHECKING
+import functools, hashlib, json, os, sys, time
 
-EMB = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-def build_chroma(docs: list[Document], persist_dir: str="vectorstore"):
-    vs = Chroma.from_documents(docs, embedding=EMB, persist_directory=persist_dir)
-    return vs
+def __getattr__(name):
+    # EMB used to be built at import time; now it loads on first access
+    if name == "EMB": return registry.embeddings(EMB_MODEL)
+    raise AttributeError(name)
+
+# Per-source / per-chunk content hashes, kept next to chroma.sqlite3
+MANIFEST = "manifest.json"
+UPSERT_BATCH = 1024  # chunks embedded + written per flush
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def source_key(meta: dict) -> str:
+    # loaders reuse "source" for every video / repo, so prefer the specific ids
+    if meta.get("video_id"): return f"youtube:{meta['video_id']}"
+    if meta.get("repo"): return f"github:{meta['repo']}/{meta.get('path') or meta.get('filename', '')}"
+    return str(meta.get("source", "?"))
+
+def chunk_id(src: str, ordinal: int) -> str:
+    return _sha1(f"{src}#{ordinal}")[:24]
+
+def text_chunk_id(src: str, text: str, nth: int = 0) -> str:
+    # by content, not position: inserting a chunk doesn't rename the ones after it;
+    # nth tells apart repeats of one text within a source
+    return _sha1(f"{src}#{_sha1(text)}#{nth}")[:24]
+
+def _ids_for(src: str, docs: Iterable[Document], seen: Counter) -> list[tuple[str, Document]]:
+    out = []
+    for d in docs:
+        h = _sha1(d.page_content)
+        out.append((text_chunk_id(src, d.page_content, seen[h]), d))
+        seen[h] += 1
+    return out
+
+def chunk_hash(doc: Document) -> str:
+    return _sha1(doc.page_content + "\0" + json.dumps(doc.metadata, sort_keys=True, default=str))
+
+def group_by_source(docs: list[Document]) -> dict[str, list[tuple[str, Document]]]:
+    """Group chunks by source with ids that are stable across runs (source + chunk text)."""
+    groups: dict[str, list[Document]] = {}
+    for d in docs:
+        groups.setdefault(source_key(d.metadata), []).append(d)
+    return {src: _ids_for(src, items, Counter()) for src, items in groups.items()}
+
+def load_manifest(persist_dir: str="vectorstore", name: str=MANIFEST) -> dict:
+    path = Path(persist_dir) / name
+    if not path.exists(): return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def save_manifest(manifest: dict, persist_dir: str="vectorstore", name: str=MANIFEST):
+    path = Path(persist_dir) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _manifest_entry(items: list[tuple[str, Document]]) -> dict:
+    chunks = {cid: chunk_hash(d) for cid, d in items}
+    return {"hash": _sha1("".join(chunks.values())), "chunks": chunks}
+
+def index_version(persist_dir: str="vectorstore") -> tuple:
+    """Changes whenever the store is rebuilt or synced; used to invalidate caches."""
+    version = []
+    for name in (MANIFEST, "chroma.sqlite3"):
+        try:
+            st = os.stat(Path(persist_dir) / name)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
 
 def load_chroma(persist_dir: str="vectorstore"):
-    return Chroma(embedding_function=EMB, persist_directory=persist_dir)
+    return registry.chroma(persist_dir)
+
+def write_chunks(vs, ids: list[str], docs: list[Document], batch_size: int | None=None,
+                 workers: int=1, threads: int | None=None) -> float:
+    """Embed `docs` with the batched engine and bulk-upsert them; returns embedding seconds."""
+    from rag.embedder import embed_texts  # numpy + model code, only needed when writing
+    t0 = time.perf_counter()
+    with tracing.span("index.embed", chunks=len(docs)):
+        vecs = embed_texts([d.page_content for d in docs], registry.embeddings(EMB_MODEL), EMB_MODEL,
+                           batch_size, workers, threads)
+    elapsed = time.perf_counter() - t0
+    with tracing.span("index.upsert", chunks=len(ids)):
+        upsert_vectors(vs, ids, vecs, docs)
+    return elapsed
+
+def upsert_vectors(vs, ids: list[str], vecs, docs: list[Document]):
+    """Write precomputed vectors, replacing any chunks with the same ids.
+
+    langchain_chroma has no public call that takes vectors, so a Chroma store
+    is written through its chromadb collection (Chroma._collection / _client,
+    present across the langchain-chroma 0.2 line pinned in requirements.txt).
+    Other LangChain stores go through add_embeddings, or add_texts (which
+    re-embeds, a cache lookup with CachedEmbeddings)."""
+    from langchain_chroma import Chroma
+    texts = [d.page_content for d in docs]
+    if isinstance(vs, Chroma):
+        step = vs._client.get_max_batch_size()
+        for i in range(0, len(ids), step):
+            vs._collection.upsert(ids=ids[i:i + step], embeddings=vecs[i:i + step].tolist(),
+                                  documents=texts[i:i + step], metadatas=[d.metadata or None for d in docs[i:i + step]])
+    elif hasattr(vs, "add_embeddings"):
+        if hasattr(vs, "index_to_docstore_id"):  # FAISS raises on ids it already holds: drop them first
+            held = set(vs.index_to_docstore_id.values())
+            stale = [i for i in ids if i in held]
+            if stale: vs.delete(ids=stale)
+        vs.add_embeddings(list(zip(texts, vecs.tolist())), [d.metadata for d in docs], ids=ids)
+    else:
+        vs.add_texts(texts, [d.metadata for d in docs], ids=ids)
+
+def _release_workers(fn):
+    # embedding worker processes (rag.embedder) live for one build / ingest call
+    @functools.wraps(fn)
+    def inner(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            embedder = sys.modules.get("rag.embedder")
+            if embedder: embedder.shutdown_pools()
+    return inner
+
+@tracing.traced("index.build_chroma")
+@_release_workers
+def build_chroma(docs: list[Document], persist_dir: str="vectorstore", batch_size: int | None=None,
+                 workers: int=1, threads: int | None=None):
+    groups = group_by_source(docs)
+    ids = [cid for items in groups.values() for cid, _ in items]
+    ordered = [d for items in groups.values() for _, d in items]
+    vs = load_chroma(persist_dir)
+    secs = write_chunks(vs, ids, ordered, batch_size, workers, threads)
+    print(f"Embedded {len(ids)} chunks in {secs:.1f}s ({len(ids) / max(secs, 1e-9):.1f} chunks/sec)")
+    save_manifest({src: _manifest_entry(items) for src, items in groups.items()}, persist_dir)
+    with tracing.span("index.bm25"):
+        build_from_store(vs, str(Path(persist_dir) / BM25_FILE))
+    return vs
+
+@tracing.traced("index.ingest_incremental")
+@_release_workers
+def ingest_incremental(docs: Iterable[Document], persist_dir: str="vectorstore", batch_size: int | None=None,
+                       workers: int=1, threads: int | None=None) -> dict:
+    """Embed/upsert only new or changed chunks; drop chunks of sources no longer in `docs`.
+
+    `docs` is the full, already chunked corpus and may be a generator (see
+    rag.pipeline.iter_chunks): chunks are consumed one source at a time and
+    upserted in batches. Returns counts of added / updated / deleted / skipped
+    chunks plus embedding throughput.
+
+    Chunk ids come from the source and the chunk text (text_chunk_id), so an
+    edit adds the new chunk and deletes the old one without renaming the rest
+    of the document. Chunks whose text is unchanged but whose metadata moved
+    (e.g. chunk_index after an insertion) count as updated; their vectors come
+    from the embedding cache rather than the model.
+
+    The BM25 index is patched with just the changed chunks (rag.bm25.update_file);
+    it is rebuilt from the whole store only when missing or after a clean start.
+    """
+    old = load_manifest(persist_dir)
+    new: dict = {}
+    stats = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0, "embed_seconds": 0.0}
+    upsert_ids, upsert_docs = [], []
+    changed: list[tuple[str, Document]] = []  # for the BM25 update; holds changed chunks only
+    vs = load_chroma(persist_dir)
+    if not old:
+        # index built before the manifest existed: its random ids can't be matched, start clean
+        stale = vs.get(include=[])["ids"]
+        for i in range(0, len(stale), UPSERT_BATCH):
+            vs.delete(ids=stale[i:i + UPSERT_BATCH])
+        stats["deleted"] += len(stale)
+
+    def flush():
+        if upsert_ids:
+            stats["embed_seconds"] += write_chunks(vs, upsert_ids, upsert_docs, batch_size, workers, threads)
+        upsert_ids.clear(); upsert_docs.clear()
+
+    seen: dict[str, Counter] = {}  # per source, so repeats split across the stream keep distinct ids
+    for src, group in groupby(docs, key=lambda d: source_key(d.metadata)):
+        chunks = new.setdefault(src, {"chunks": {}})["chunks"]
+        start = len(chunks)
+        items = _ids_for(src, group, seen.setdefault(src, Counter()))
+        hashes = {cid: chunk_hash(d) for cid, d in items}
+        chunks.update(hashes)
+        prev_chunks = old.get(src, {}).get("chunks", {})
+        if start == 0 and old.get(src, {}).get("hash") == _sha1("".join(hashes.values())):
+            stats["skipped"] += len(items)
+            continue
+        for cid, d in items:
+            if prev_chunks.get(cid) == hashes[cid]:
+                stats["skipped"] += 1
+                continue
+            stats["updated" if cid in prev_chunks else "added"] += 1
+            upsert_ids.append(cid); upsert_docs.append(d); changed.append((cid, d))
+            if len(upsert_ids) >= UPSERT_BATCH: flush()
+    flush()
+
+    delete_ids = []
+    for src, prev in old.items():
+        current = new.get(src, {}).get("chunks", {})
+        delete_ids += [cid for cid in prev.get("chunks", {}) if cid not in current]
+    for i in range(0, len(delete_ids), UPSERT_BATCH):
+        vs.delete(ids=delete_ids[i:i + UPSERT_BATCH])
+    stats["deleted"] += len(delete_ids)
+
+    for entry in new.values():
+        entry["hash"] = _sha1("".join(entry["chunks"].values()))
+    save_manifest(new, persist_dir)
+    bm25_path = str(Path(persist_dir) / BM25_FILE)
+    with tracing.span("index.bm25"):
+        if not old or not os.path.exists(bm25_path):
+            build_from_store(vs, bm25_path)
+        elif changed or delete_ids:
+            update_file(vs, bm25_path, changed, delete_ids)
+    embedded = stats["added"] + stats["updated"]
+    stats["chunks_per_sec"] = round(embedded / stats["embed_seconds"], 1) if embedded else 0.0
+    stats["embed_seconds"] = round(stats["embed_seconds"], 2)
+    return stats
@@ -1,27 +1,48 @@
 # rag/loaders.py
 from pathlib import Path
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from youtube_transcript_api import YouTubeTranscriptApi
 from langchain.schema import Document
-import requests, re, base64
+import base64, time
+from rag import tracing
+from rag.fetch import API_BASE, default_fetcher
 
+TRANSCRIPT_MAX_AGE = 7 * 24 * 3600  # transcripts rarely change; YouTube offers no ETag to revalidate with
+README_MAX_AGE = 3600               # after that a README is revalidated by ETag (304s are free)
+
+def _typed(docs: list[Document], kind: str) -> list[Document]:
+    # `type` is one of the filterable fields (rag.filters)
+    for d in docs: d.metadata.setdefault("type", kind)
+    return docs
+
+@tracing.traced("loaders.load_pdf")
 def load_pdf(path: Path) -> list[Document]:
-    return PyPDFLoader(str(path)).load()
+    return _typed(PyPDFLoader(str(path)).load(), "pdf")
 
+@tracing.traced("loaders.load_markdown")
 def load_markdown(path: Path) -> list[Document]:
-    return TextLoader(str(path), encoding="utf-8").load()
+    return _typed(TextLoader(str(path), encoding="utf-8").load(), "markdown")
 
+@tracing.traced("loaders.load_youtube_transcript")
 def load_youtube_transcript(url_or_id: str) -> list[Document]:
     video_id = url_or_id.split("v=")[-1].split("&")[0] if "youtube" in url_or_id else url_or_id
-    print("<<<<<<<<<<<<<<<<<<<<<<<",video_id)
-    transcript = YouTubeTranscriptApi.fetch(video_id)
-    text = " ".join([t["text"] for t in transcript])
-    return [Document(page_content=text, metadata={"source":"youtube", "video_id":vid})]
+    fetcher, key = default_fetcher(), f"youtube-transcript:{video_id}"
+    hit = fetcher.cached(key)
+    if hit and hit[0].ok and time.time() - hit[1]["fetched"] < TRANSCRIPT_MAX_AGE:
+        text = hit[0].text
+    else:
+        from youtube_transcript_api import YouTubeTranscriptApi
+        transcript = YouTubeTranscriptApi(http_client=fetcher.session).fetch(video_id)
+        text = " ".join(t["text"] for t in transcript.to_raw_data())
+        fetcher.store(key, 200, text.encode("utf-8"))
+    meta = {"source":"youtube", "video_id":video_id, "type":"youtube_transcript"}
+    return [Document(page_content=text, metadata=meta)]
 
+@tracing.traced("loaders.load_github_readme")
 def load_github_readme(repo: str) -> list[Document]:
     # repo example: "owner/name"
-    api = f"https://api.github.com/repos/{repo}/readme"
-    r = requests.get(api, headers={"Accept":"application/vnd.github+json"})
+    api = f"{API_BASE}/repos/{repo}/readme"
+    r = default_fetcher().get(api, headers={"Accept":"application/vnd.github+json"}, max_age=README_MAX_AGE)
     if r.status_code != 200: return []
     content = base64.b64decode(r.json()["content"]).decode("utf-8", errors="ignore")
-    return [Document(page_content=content, metadata={"source":"github", "repo":repo, "path":"README.md"})]
+    meta = {"source":"github", "repo":repo, "path":"README.md", "type":"github_readme"}
+    return [Document(page_content=content, metadata=meta)]
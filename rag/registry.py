@@ -0,0 +1,77 @@
+# rag/registry.py
+"""Process-wide registry of heavy resources: embedding models, vector stores, LLM clients.
+
+Nothing is built at import time. Each resource is created on first use
+(thread-safe, once per process) and shared afterwards; `warm_up()` builds
+the common ones ahead of the first request.
+"""
+import os, threading
+
+# NSK_EMB_MODEL may point at a local model dir for offline runs (see scripts/bench_retrieval.py)
+EMB_MODEL = os.getenv("NSK_EMB_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+QA_MODEL = "llama-3.1-8b-instant"
+VECTORSTORE = os.getenv("NSK_VECTORSTORE", "vectorstore")  # Chroma dir the agent and app.py serve from
+
+_LOCK = threading.RLock()
+_RESOURCES: dict = {}
+
+def get(key, factory):
+    try:
+        return _RESOURCES[key]
+    except KeyError:
+        with _LOCK:
+            if key not in _RESOURCES:
+                _RESOURCES[key] = factory()
+            return _RESOURCES[key]
+
+def reset(key=None):
+    with _LOCK:
+        if key is None: _RESOURCES.clear()
+        else: _RESOURCES.pop(key, None)
+
+def embeddings(model_name: str = EMB_MODEL):
+    def make():
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        from rag.embed_cache import CachedEmbeddings
+        return CachedEmbeddings(HuggingFaceEmbeddings(model_name=model_name), model_name)
+    return get(("embeddings", model_name), make)
+
+def chroma(persist_dir: str = VECTORSTORE):
+    def make():
+        from langchain_chroma import Chroma
+        return Chroma(embedding_function=embeddings(), persist_directory=persist_dir)
+    return get(("chroma", os.path.abspath(persist_dir)), make)
+
+def faiss(path: str = "faiss_index"):
+    def make():
+        from langchain_community.vectorstores import FAISS
+        # our own index on local disk, so pickle loading is fine
+        return FAISS.load_local(path, embeddings(), allow_dangerous_deserialization=True)
+    return get(("faiss", os.path.abspath(path)), make)
+
+def backend(path: str = "faiss_index"):
+    """VectorBackend for a faiss index dir: quantized/mmapped if built by
+    rag.backends.build_faiss, else the LangChain FAISS store wrapped."""
+    def make():
+        from rag.backends import DOCS_FILE, FaissBackend, as_backend
+        if os.path.exists(os.path.join(path, DOCS_FILE)):
+            return FaissBackend(path, embeddings())
+        return as_backend(faiss(path))
+    return get(("backend", os.path.abspath(path)), make)
+
+def llm(model: str = QA_MODEL, temperature: float = 0.2):
+    def make():
+        if os.getenv("NSK_STUB_LLM") == "1":  # offline load tests, see rag/stub_llm.py
+            from rag.stub_llm import StubChatModel
+            return StubChatModel()
+        from dotenv import load_dotenv
+        from langchain_groq import ChatGroq
+        load_dotenv()
+        return ChatGroq(model=model, temperature=temperature)
+    return get(("llm", model, temperature), make)
+
+def warm_up(persist_dir: str = VECTORSTORE, with_llm: bool = True):
+    """Build the shared resources now instead of on the first request."""
+    embeddings().embed_query("warm up")
+    chroma(persist_dir)
+    if with_llm: llm()
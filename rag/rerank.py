@@ -0,0 +1,81 @@
+# rag/rerank.py
+"""Cross-encoder re-ranking of over-fetched candidates.
+
+A small local cross-encoder reads (query, chunk) pairs together, which ranks
+far better than bi-encoder cosine, so fewer chunks need to reach the LLM.
+Pairs are scored in length-sorted CPU batches and memoised in an LRU cache.
+If the uncached pairs are predicted to blow the latency budget (or scoring
+runs over it), the candidates keep their retrieval order instead.
+"""
+from __future__ import annotations
+import hashlib, os, threading, time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from rag import registry
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+RERANK_MODEL = os.getenv("NSK_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+FETCH_K = 50          # candidates handed to the cross-encoder
+BUDGET_MS = 300.0     # per query
+BATCH_SIZE = 16
+
+class Reranker:
+    def __init__(self, model, batch_size: int = BATCH_SIZE, cache_size: int = 50_000):
+        self.model, self.batch_size, self.cache_size = model, batch_size, cache_size
+        self._scores: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.ms_per_pair = None  # running estimate, used to predict the cost of a call
+
+    def _key(self, query: str, text: str) -> str:
+        return hashlib.sha1(f"{query}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict:
+        with self._lock:
+            found = {k: self._scores[k] for k in keys if k in self._scores}
+            for k in found: self._scores.move_to_end(k)
+        return found
+
+    def _remember(self, scores: dict):
+        with self._lock:
+            self._scores.update(scores)
+            while len(self._scores) > self.cache_size: self._scores.popitem(last=False)
+
+    def score(self, query: str, texts: list[str], budget_ms: float | None = None) -> list[float] | None:
+        """Cross-encoder scores for `texts`, or None if they cannot be had within `budget_ms`."""
+        keys = [self._key(query, t) for t in texts]
+        scores = self._lookup(keys)
+        todo = sorted({k: t for k, t in zip(keys, texts) if k not in scores}.items(), key=lambda kt: len(kt[1]))
+        if todo and budget_ms is not None and self.ms_per_pair and self.ms_per_pair * len(todo) > budget_ms:
+            self.ms_per_pair *= 0.9  # decay, so a slow spell does not disable re-ranking for good
+            return None
+        start = time.perf_counter()
+        for i in range(0, len(todo), self.batch_size):
+            batch = todo[i:i + self.batch_size]
+            out = self.model.predict([(query, t) for _, t in batch], batch_size=self.batch_size,
+                                     show_progress_bar=False)
+            fresh = {k: float(s) for (k, _), s in zip(batch, out)}
+            scores.update(fresh); self._remember(fresh)
+            elapsed = (time.perf_counter() - start) * 1000
+            if budget_ms is not None and elapsed > budget_ms and i + len(batch) < len(todo):
+                self._observe(elapsed, i + len(batch))
+                return None
+        if todo: self._observe((time.perf_counter() - start) * 1000, len(todo))
+        return [scores[k] for k in keys]
+
+    def _observe(self, ms: float, pairs: int):
+        per = ms / pairs
+        self.ms_per_pair = per if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * per
+
+    def rerank(self, query: str, docs: list[Document], k: int, budget_ms: float | None = BUDGET_MS) -> list[Document]:
+        scores = self.score(query, [d.page_content for d in docs], budget_ms)
+        if scores is None: return docs[:k]  # over budget: keep retrieval order
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:k]]
+
+def reranker(model_name: str = RERANK_MODEL) -> Reranker:
+    def make():
+        from sentence_transformers import CrossEncoder
+        return Reranker(CrossEncoder(model_name, device="cpu", max_length=512))
+    return registry.get(("reranker", model_name), make)
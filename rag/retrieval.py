@@ -1,6 +1,76 @@
 # rag/retrieval.py
-from typing import List
-from langchain_core.documents import Document
+from __future__ import annotations
+from pathlib import Path
+from typing import List, TYPE_CHECKING
+from rag import tracing
+from rag.backends import as_backend
+from rag.bm25 import BM25_FILE, load_bm25
+from rag.filters import SearchFilter, as_filter
 
-def top_k(vs, query: str, k: int=4) -> List[Document]:
-    return vs.similarity_search(query, k=k)
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+RRF_K = 60  # reciprocal rank fusion constant
+
+def top_k(vs, query: str, k: int=4, filter: SearchFilter | dict | None=None) -> List[Document]:
+    # vs: any LangChain vector store or a rag.backends.VectorBackend; filter narrows the search up front
+    with tracing.span("retrieval.top_k", k=k):
+        return as_backend(vs).search(query, k, as_filter(filter))
+
+def top_k_many(vs, queries: List[str], k: int=4, filter: SearchFilter | dict | None=None) -> List[List[Document]]:
+    """`top_k` for many queries: one embedding batch, one index search; results in input order."""
+    with tracing.span("retrieval.top_k_many", k=k, queries=len(queries)):
+        return as_backend(vs).search_many(list(queries), k, as_filter(filter))
+
+def _key(d: Document) -> str:
+    return d.id or d.page_content
+
+def _bm25_for(vs, bm25_path: str | None):
+    return load_bm25(bm25_path or str(Path(getattr(vs, "_persist_directory", None) or "vectorstore") / BM25_FILE))
+
+def _fuse(ranked: List[List[Document]], k: int) -> List[Document]:
+    scores, docs = {}, {}
+    for results in ranked:
+        for rank, d in enumerate(results):
+            key = _key(d)
+            docs.setdefault(key, d)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+def hybrid_top_k(vs, query: str, k: int=4, fetch_k: int=20, bm25_path: str | None=None,
+                 filter: SearchFilter | dict | None=None) -> List[Document]:
+    """Dense + BM25 results fused with reciprocal rank fusion.
+
+    Falls back to plain `top_k` when no lexical index has been built yet.
+    """
+    f = as_filter(filter)
+    lexical = _bm25_for(vs, bm25_path)
+    if lexical is None:
+        return top_k(vs, query, k, f)
+    dense = top_k(vs, query, fetch_k, f)
+    with tracing.span("retrieval.bm25", k=fetch_k):
+        sparse = [d for d, _ in lexical.search(query, fetch_k, f)]
+    return _fuse([dense, sparse], k)
+
+def hybrid_top_k_many(vs, queries: List[str], k: int=4, fetch_k: int=20, bm25_path: str | None=None,
+                      filter: SearchFilter | dict | None=None) -> List[List[Document]]:
+    f = as_filter(filter)
+    lexical = _bm25_for(vs, bm25_path)
+    if lexical is None:
+        return top_k_many(vs, queries, k, f)
+    dense = top_k_many(vs, queries, fetch_k, f)
+    return [_fuse([hits, [d for d, _ in lexical.search(q, fetch_k, f)]], k) for q, hits in zip(queries, dense)]
+
+def rerank_top_k(vs, query: str, k: int=4, fetch_k: int | None=None, budget_ms: float | None=None,
+                 bm25_path: str | None=None, filter: SearchFilter | dict | None=None) -> List[Document]:
+    """Hybrid retrieval of `fetch_k` candidates, re-scored by a cross-encoder (rag.rerank).
+
+    Over the latency budget the candidates keep their fused order.
+    """
+    from rag import rerank
+    fetch_k = fetch_k or rerank.FETCH_K
+    candidates = hybrid_top_k(vs, query, fetch_k, fetch_k=fetch_k, bm25_path=bm25_path, filter=filter)
+    budget_ms = rerank.BUDGET_MS if budget_ms is None else budget_ms
+    with tracing.span("retrieval.rerank", candidates=len(candidates)):
+        return rerank.reranker().rerank(query, candidates, k, budget_ms)
@@ -0,0 +1,31 @@
+# rag/stub_llm.py
+"""Offline stand-in for ChatGroq, for load tests and local serving without an API key.
+
+Enabled by NSK_STUB_LLM=1 (see rag.registry.llm). Replies echo the end of the
+prompt after NSK_STUB_LLM_DELAY seconds, so end-to-end latency stays realistic.
+"""
+import asyncio, os, time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+class StubChatModel(BaseChatModel):
+    delay: float = float(os.getenv("NSK_STUB_LLM_DELAY", "0.5"))
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages) -> ChatResult:
+        self.calls += 1
+        tail = str(messages[-1].content)[-200:] if messages else ""
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"[stub answer] {tail}"))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return self._reply(messages)
@@ -0,0 +1,158 @@
+# rag/tracing.py
+"""Spans, counters and an opt-in profiler for the RAG pipeline.
+
+Off by default. `enable()` (or NSK_TRACE=1) turns it on; while off, `span()`
+hands back one shared no-op context manager and `@traced` functions make a
+single flag check before calling straight through.
+
+    from rag import tracing
+    tracing.enable()                        # .cache/trace/spans.jsonl + metrics.prom
+    with tracing.span("retrieval.top_k", k=4): ...
+    with tracing.profile("answer"): ...     # cProfile (or pyinstrument) one request
+
+Spans nest through contextvars, so children recorded in asyncio.to_thread
+workers still point at their parent. Every finished span is appended to the
+JSONL file; per-span latency histograms and counters go to a Prometheus
+text file on `flush()` / exit.
+"""
+import atexit, contextvars, functools, itertools, json, os, threading, time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+TRACE_DIR = ".cache/trace"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # seconds
+
+ENABLED = False
+_NOOP = nullcontext()
+_current = contextvars.ContextVar("nsk_span", default=None)  # (trace id, span id)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_hist: dict = {}      # span name -> [bucket counts..., +Inf count, sum]
+_counters: dict = {}
+_out = {"jsonl": None, "prom": None, "file": None}
+
+def enable(jsonl_path: str | None = None, prom_path: str | None = None):
+    global ENABLED
+    Path(TRACE_DIR).mkdir(parents=True, exist_ok=True)
+    _out["jsonl"] = jsonl_path or os.path.join(TRACE_DIR, "spans.jsonl")
+    _out["prom"] = prom_path or os.path.join(TRACE_DIR, "metrics.prom")
+    if _out["file"]: _out["file"].close()  # enabled again: switch files, don't leak the old handle
+    _out["file"] = open(_out["jsonl"], "a", encoding="utf-8", buffering=1)
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+    flush()
+    if _out["file"]: _out["file"].close(); _out["file"] = None
+
+def _record(name: str, seconds: float, line: str | None):
+    with _lock:
+        h = _hist.get(name)
+        if h is None: h = _hist[name] = [0] * (len(BUCKETS) + 2)
+        h[bisect_left(BUCKETS, seconds)] += 1
+        h[-1] += seconds
+        if line and _out["file"]: _out["file"].write(line)
+
+@contextmanager
+def _span(name: str, attrs: dict):
+    parent = _current.get()
+    sid = next(_ids)
+    trace = parent[0] if parent else sid
+    token = _current.set((trace, sid))
+    start, t = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield attrs  # callers may add attributes (e.g. result sizes) while the span is open
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - t
+        _current.reset(token)
+        rec = {"ts": round(start, 6), "name": name, "ms": round(seconds * 1000, 3), "trace": trace,
+               "span": sid, "parent": parent[1] if parent else None, "pid": os.getpid(), **attrs}
+        if error: rec["error"] = error
+        _record(name, seconds, json.dumps(rec, default=str) + "\n")
+
+def span(name: str, **attrs):
+    """Time a block as `name`; a shared no-op when tracing is off."""
+    if not ENABLED: return _NOOP
+    return _span(name, attrs)
+
+def traced(name: str | None = None):
+    """Decorator form of `span`, named after the function by default."""
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED: return fn(*args, **kwargs)
+            with _span(label, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def incr(name: str, n: int = 1):
+    if not ENABLED: return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _metric(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus_text() -> str:
+    lines = ["# TYPE nsk_span_seconds histogram"]
+    with _lock:
+        for name, h in sorted(_hist.items()):
+            cum = 0
+            for le, n in zip((*BUCKETS, "+Inf"), h[:-1]):
+                cum += n
+                lines.append(f'nsk_span_seconds_bucket{{span="{name}",le="{le}"}} {cum}')
+            lines.append(f'nsk_span_seconds_sum{{span="{name}"}} {h[-1]:.6f}')
+            lines.append(f'nsk_span_seconds_count{{span="{name}"}} {cum}')
+        for name, n in sorted(_counters.items()):
+            lines += [f"# TYPE nsk_{_metric(name)}_total counter", f"nsk_{_metric(name)}_total {n}"]
+    return "\n".join(lines) + "\n"
+
+def flush():
+    if _out["prom"] and (_hist or _counters):
+        tmp = _out["prom"] + ".tmp"
+        Path(tmp).write_text(prometheus_text(), encoding="utf-8")
+        os.replace(tmp, _out["prom"])
+
+@contextmanager
+def profile(label: str = "profile", engine: str | None = None, out_dir: str = TRACE_DIR):
+    """Profile one block (e.g. a single request) to `out_dir`.
+
+    engine: "cprofile" (stdlib, .prof for snakeviz / pstats) or "pyinstrument"
+    (.html, also follows async code); default from NSK_PROFILER, else cprofile.
+    Yields a dict whose "path" is filled in when the block ends.
+    """
+    engine = engine or os.getenv("NSK_PROFILER", "cprofile")
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    result = {"path": None}
+    stem = os.path.join(out_dir, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{next(_ids)}")
+    if engine == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        try:
+            yield result
+        finally:
+            prof.stop()
+            result["path"] = stem + ".html"
+            Path(result["path"]).write_text(prof.output_html(), encoding="utf-8")
+    else:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield result
+        finally:
+            prof.disable()
+            result["path"] = stem + ".prof"
+            prof.dump_stats(result["path"])
+
+atexit.register(flush)
+if os.getenv("NSK_TRACE") == "1": enable()
@@ -1,11 +1,17 @@
-from langchain.vectorstores import FAISS
-from langchain.embeddings import SentenceTransformerEmbeddings
+from rag import registry
 
-embedding_model = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-vector_store = FAISS.load_local("faiss_index", embedding=embedding_model)
+# Shares the embedding model (and its cache) with rag.index; both load on first use.
+FAISS_PATH = "faiss_index"
 
-def retrieve_top_k(query: str, k: int = 5):
-    results = vector_store.similarity_search_with_score(query, k=k)
+def __getattr__(name):
+    if name == "embedding_model": return registry.embeddings()
+    if name == "vector_store": return registry.faiss(FAISS_PATH)
+    raise AttributeError(name)
+
+def retrieve_top_k(query: str, k: int = 5, filter=None):
+    # score is a relevance value, higher is better, whichever backend is on disk;
+    # filter: rag.filters.SearchFilter or a dict of its fields
+    results = registry.backend(FAISS_PATH).search_with_scores(query, k, filter)
     output = []
     for doc, score in results:
         output.append({
@@ -14,3 +20,9 @@ def retrieve_top_k(query: str, k: int = 5):
             "score": score
         })
     return output
+
+def retrieve_top_k_many(queries: list[str], k: int = 5, filter=None):
+    """`retrieve_top_k` for a batch of queries, in input order."""
+    results = registry.backend(FAISS_PATH).search_many_with_scores(list(queries), k, filter)
+    return [[{"content": doc.page_content, "metadata": doc.metadata, "score": score} for doc, score in hits]
+            for hits in results]
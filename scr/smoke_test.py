@@ -9,6 +9,7 @@ from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.chat_models import ChatOpenAI
 from langchain.chains import RetrievalQA
+from rag.embed_cache import CachedEmbeddings
 
 
 def build_index(file_path: str, persist_dir: str = "chroma_index"):
@@ -24,7 +25,7 @@ def build_index(file_path: str, persist_dir: str = "chroma_index"):
     chunks = splitter.split_documents(docs)
 
     # Build embeddings and store in Chroma
-    embeddings = OpenAIEmbeddings()
+    embeddings = CachedEmbeddings(OpenAIEmbeddings())  # rebuilds reuse cached vectors
     db = Chroma.from_documents(chunks, embeddings, persist_directory=persist_dir)
     db.persist()
 
@@ -0,0 +1,128 @@
+# scripts/bench_retrieval.py
+"""Retrieval benchmark: build time, latency percentiles, QPS, memory and recall@k / MRR.
+
+Builds a throwaway index from data/ and resources/, replays a labelled query
+set through rag.retrieval.top_k / hybrid_top_k and retrieval.retrieve_top_k,
+and writes the numbers as JSON so runs can be diffed when the chunker,
+embedder or backend changes.
+
+    python scripts/bench_retrieval.py --model /path/to/all-MiniLM-L6-v2 --out bench.json
+
+With --model pointing at a local model dir the run is fully offline.
+"""
+import argparse, json, os, resource, shutil, statistics, sys, tempfile, time, tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+def percentiles(ms: list[float]) -> dict:
+    q = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {"p50": round(q[49], 3), "p95": round(q[94], 3), "p99": round(q[98], 3),
+            "mean": round(statistics.fmean(ms), 3)}
+
+def is_relevant(text: str, labels: list[str]) -> bool:
+    text = text.lower()
+    return any(l.lower() in text for l in labels)
+
+def quality(search, queries: list[dict], k: int) -> dict:
+    hits, rr = 0, 0.0
+    for q in queries:
+        ranks = [i for i, t in enumerate(search(q["query"])[:k], 1) if is_relevant(t, q["relevant"])]
+        if ranks:
+            hits += 1
+            rr += 1.0 / ranks[0]
+    return {f"recall@{k}": round(hits / len(queries), 3), "mrr": round(rr / len(queries), 3)}
+
+def latency(search, queries: list[dict], reps: int, concurrency: int) -> dict:
+    search(queries[0]["query"])  # warm-up
+    ms = []
+    for _ in range(reps):
+        for q in queries:
+            t = time.perf_counter(); search(q["query"]); ms.append((time.perf_counter() - t) * 1000)
+    work = [q["query"] for q in queries] * reps
+    t = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(search, work))
+    qps = len(work) / (time.perf_counter() - t)
+    return {"latency_ms": percentiles(ms), f"qps@{concurrency}": round(qps, 1)}
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", help="local embedding model dir (enables offline mode)")
+    ap.add_argument("--sources", nargs="*", default=["data", "resources"])
+    ap.add_argument("--queries", default=str(ROOT / "resources/bench/queries.jsonl"))
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--faiss-kind", default="ivfpq", help="index kind for rag.backends.build_faiss")
+    ap.add_argument("--nprobe", type=int, default=16)
+    ap.add_argument("--embed-cache", action="store_true", help="go through the disk embedding cache")
+    ap.add_argument("--out", default=str(ROOT / ".cache/bench/retrieval.json"))
+    args = ap.parse_args()
+
+    if args.model:
+        os.environ.update(NSK_EMB_MODEL=args.model, HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1")
+    from rag import registry
+    if not args.embed_cache:
+        # measure real forward passes, not cache hits from earlier runs
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        registry.get(("embeddings", registry.EMB_MODEL), lambda: HuggingFaceEmbeddings(model_name=registry.EMB_MODEL))
+    from rag.index import ingest_incremental
+    from rag.pipeline import iter_chunks, iter_dir
+    from rag.retrieval import top_k, hybrid_top_k
+    import retrieval
+
+    queries = [json.loads(l) for l in Path(args.queries).read_text(encoding="utf-8").splitlines() if l.strip()]
+    files = [p for src in args.sources for p in iter_dir(ROOT / src, ("*.pdf", "*.md"))]
+    work = Path(tempfile.mkdtemp(prefix="nsk-bench-"))
+    report = {"model": registry.EMB_MODEL, "files": len(files), "queries": len(queries), "k": args.k}
+
+    tracemalloc.start()
+    t = time.perf_counter()
+    chunks = list(iter_chunks(files))
+    report["chunks"] = len(chunks)
+    report["ingest"] = ingest_incremental(chunks, str(work / "chroma"))
+    report["build_s"] = {"chroma": round(time.perf_counter() - t, 2)}
+    t = time.perf_counter()
+    from langchain_community.vectorstores import FAISS
+    FAISS.from_documents(chunks, registry.embeddings()).save_local(str(work / "faiss"))
+    report["build_s"]["faiss"] = round(time.perf_counter() - t, 2)
+    retrieval.FAISS_PATH = str(work / "faiss")
+    t = time.perf_counter()
+    from rag.backends import build_faiss
+    quantized = build_faiss(chunks, str(work / "faiss_q"), kind=args.faiss_kind)
+    quantized.nprobe = args.nprobe
+    report["build_s"]["faiss_q"] = round(time.perf_counter() - t, 2)
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()  # tracing would skew the latency numbers below
+
+    vs = registry.chroma(str(work / "chroma"))
+    backends = {
+        "rag.retrieval.top_k": lambda q: [d.page_content for d in top_k(vs, q, args.k)],
+        "rag.retrieval.hybrid_top_k": lambda q: [d.page_content for d in hybrid_top_k(vs, q, args.k)],
+        "retrieval.retrieve_top_k": lambda q: [r["content"] for r in retrieval.retrieve_top_k(q, args.k)],
+        f"rag.backends.FaissBackend({args.faiss_kind})": lambda q: [d.page_content for d in top_k(quantized, q, args.k)],
+    }
+    report["backends"] = {}
+    for name, search in backends.items():
+        stats = latency(search, queries, args.reps, args.concurrency)
+        stats.update(quality(search, queries, args.k))
+        report["backends"][name] = stats
+        print(name, json.dumps(stats))
+
+    report["memory"] = {"build_python_peak_mb": round(build_peak / 2**20, 1),
+                        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                        "index_disk_mb": {p.name: round(dir_size(p) / 2**20, 2) for p in work.iterdir()}}
+    shutil.rmtree(work, ignore_errors=True)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print("wrote", out)
+
+if __name__ == "__main__":
+    main()
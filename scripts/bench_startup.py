@@ -0,0 +1,43 @@
+# scripts/bench_startup.py
+"""Cold-start benchmark: import time of each entry module in a fresh interpreter,
+plus (with --warm) the time `rag.registry.warm_up()` takes to load models/stores.
+
+    python scripts/bench_startup.py [--warm] [--runs 3]
+"""
+import argparse, json, statistics, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ["rag.index", "rag.retrieval", "agent.tools", "agent.agent",
+           "evaluator.repo_eval_phase1", "retrieval"]
+
+SNIPPET = """
+import time; t = time.perf_counter()
+{stmt}
+print(time.perf_counter() - t)
+"""
+
+def timed(stmt: str) -> float:
+    out = subprocess.run([sys.executable, "-c", SNIPPET.format(stmt=stmt)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--warm", action="store_true", help="also time registry.warm_up()")
+    args = ap.parse_args()
+
+    report = {}
+    for mod in MODULES:
+        ms = [timed(f"import {mod}") * 1000 for _ in range(args.runs)]
+        report[mod] = round(statistics.median(ms), 1)
+        print(f"import {mod:<30} {report[mod]:>8.1f} ms")
+    if args.warm:
+        ms = timed("from rag import registry; registry.warm_up(with_llm=False)") * 1000
+        report["warm_up"] = round(ms, 1)
+        print(f"{'registry.warm_up()':<37} {ms:>8.1f} ms")
+    print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
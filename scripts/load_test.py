@@ -0,0 +1,77 @@
+# scripts/load_test.py
+"""Load test for app.py: N concurrent clients replaying questions / searches.
+
+    python scripts/load_test.py --spawn --requests 400 --concurrency 32
+
+--spawn starts `uvicorn app:app` itself with the stub LLM (NSK_STUB_LLM=1),
+so the run needs no API key and measures our own serving overhead. Questions
+repeat across clients, which exercises request coalescing and the answer cache.
+"""
+import argparse, json, os, statistics, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT = Path(__file__).resolve().parents[1]
+QUESTIONS = ["What are Phase One requirements?", "How do I chunk PDFs?", "Which vector store should I use?",
+             "What is retrieval augmented generation?", "How are projects evaluated?",
+             "Find all sessions about Agentic AI", "How do I build a Streamlit UI?", "What is Level 2 about?"]
+
+def percentiles(ms: list[float]) -> dict:
+    q = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {"p50": round(q[49], 1), "p95": round(q[94], 1), "p99": round(q[98], 1), "max": round(max(ms), 1)}
+
+def wait_ready(base: str, timeout: float = 120):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            if requests.get(f"{base}/metrics", timeout=2).ok: return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base} did not come up")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--spawn", action="store_true", help="start uvicorn with the stub LLM")
+    ap.add_argument("--endpoint", choices=["ask", "search"], default="ask")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--no-cache", action="store_true", help="bypass the semantic answer cache")
+    args = ap.parse_args()
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(":", 1)[-1]
+        env = dict(os.environ, NSK_STUB_LLM="1")
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", port, "--log-level", "warning"],
+                                  cwd=ROOT, env=env)
+    try:
+        wait_ready(args.url)
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency))
+
+        def one(i: int):
+            q = QUESTIONS[i % len(QUESTIONS)]
+            body = ({"question": q, "use_cache": not args.no_cache} if args.endpoint == "ask" else {"query": q})
+            t = time.perf_counter()
+            r = session.post(f"{args.url}/{args.endpoint}", json=body, timeout=300)
+            return (time.perf_counter() - t) * 1000, r.status_code
+
+        t = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(one, range(args.requests)))
+        wall = time.perf_counter() - t
+        ms = [m for m, _ in results]
+        report = {"endpoint": args.endpoint, "requests": args.requests, "concurrency": args.concurrency,
+                  "errors": sum(1 for _, s in results if s != 200), "rps": round(len(results) / wall, 1),
+                  "latency_ms": percentiles(ms), "server": session.get(f"{args.url}/metrics").json()}
+        print(json.dumps(report, indent=2))
+    finally:
+        if server:
+            server.terminate(); server.wait()
+
+if __name__ == "__main__":
+    main()
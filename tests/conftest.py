@@ -0,0 +1,81 @@
+# tests/conftest.py
+import hashlib, json, os, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# modules are imported as top-level packages (rag, agent, evaluator) from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class GitHubStub:
+    """Local stand-in for api.github.com + raw.githubusercontent.com serving one mutable repo.
+
+    `files` maps path -> text; `fail` maps a path (or "tree" / "head") to an HTTP status
+    returned instead of the content; `hits` records every request path.
+    """
+    def __init__(self):
+        self.files: dict[str, str] = {}
+        self.fail: dict[str, int] = {}
+        self.hits: list[str] = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def sha(text: str) -> str:
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def commit(self) -> str:
+        return self.sha(json.dumps(self.files, sort_keys=True))
+
+    def respond(self, path: str) -> tuple[int, bytes, dict]:
+        if "/commits/" in path:
+            return self.fail.get("head", 200), self.commit().encode(), {}
+        if "/git/trees/" in path:
+            if "tree" in self.fail:
+                return self.fail["tree"], b'{"message": "API rate limit exceeded"}', {"X-RateLimit-Remaining": "0"}
+            tree = [{"path": p, "type": "blob", "sha": self.sha(t), "size": len(t)} for p, t in self.files.items()]
+            return 200, json.dumps({"sha": self.commit(), "tree": tree}).encode(), {}
+        name = path.split("/", 5)[5]  # /raw/<owner>/<repo>/<ref>/<path>
+        if name in self.fail: return self.fail[name], b"", {}
+        if name not in self.files: return 404, b"", {}
+        return 200, self.files[name].encode(), {}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.hits.append(self.path)
+                status, body, headers = stub.respond(self.path)
+                self.send_response(status)
+                for k, v in headers.items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        return Handler
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    """A rag.fetch.Fetcher with its own response cache, installed as the default one; no backoff sleeps."""
+    from rag import fetch, registry
+    f = fetch.Fetcher(str(tmp_path / "http.sqlite"))
+    monkeypatch.setitem(registry._RESOURCES, "fetcher", f)
+    monkeypatch.setattr(fetch, "BACKOFF", 0.0)
+    return f
+
+@pytest.fixture
+def github(monkeypatch, fetcher):
+    from evaluator import repo_eval_phase1 as p1
+    stub = GitHubStub()
+    monkeypatch.setattr(p1, "API_BASE", stub.base)
+    monkeypatch.setattr(p1, "RAW_BASE", stub.base + "/raw")
+    yield stub
+    stub.server.shutdown()
+
+@pytest.fixture
+def eval_cache(tmp_path):
+    from evaluator.cache import EvalCache
+    return EvalCache(str(tmp_path / "evaluator.sqlite"))
@@ -0,0 +1,29 @@
+# tests/test_agent.py
+from agent import agent
+
+class Resp:
+    def __init__(self, content):
+        self.content = content
+
+class FakeLLM:
+    """batch() answers every question except those mentioning "boom"."""
+    def batch(self, msgs, config=None, return_exceptions=False):
+        out = []
+        for m in msgs:
+            if "boom" in m[-1]["content"]:
+                err = RuntimeError("groq 503")
+                if not return_exceptions: raise err
+                out.append(err)
+            else:
+                out.append(Resp("answer"))
+        return out
+
+def test_one_failed_llm_call_fails_only_its_question(monkeypatch):
+    monkeypatch.setattr(agent, "_llm", lambda: FakeLLM())
+    monkeypatch.setattr(agent, "tool_search_docs_many",
+                        lambda qs, k=4: [(f"context for {q}", [{"source": "notes.md"}]) for q in qs])
+    monkeypatch.setattr(agent, "_messages", lambda q, ctx: [{"role": "user", "content": f"{q}\n{ctx}"}])
+    out = agent.answer_questions(["what is rag", "boom", "what is bm25"], use_cache=False)
+    assert out[0].startswith("answer\n") and "notes.md" in out[0]
+    assert out[1].startswith("Answer failed: RuntimeError")
+    assert out[2].startswith("answer\n")
@@ -0,0 +1,66 @@
+# tests/test_answer_cache.py
+import pytest
+from agent import answer_cache
+from agent.answer_cache import SemanticCache
+
+# cosine to "what is rag": "what is rag?" 0.99, "explain rag" 0.97, the others 0
+VECS = {"what is rag": [1.0, 0.0, 0.0], "what is rag?": [0.99, 0.14, 0.0], "explain rag": [0.97, 0.24, 0.0],
+        "what is bm25": [0.0, 1.0, 0.0], "what is faiss": [0.0, 0.0, 1.0]}
+
+class Table:
+    """embed_query from a fixed table of question vectors."""
+    def embed_query(self, text):
+        return VECS[text]
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", c.time)
+    return c
+
+def test_threshold(clock):
+    c = SemanticCache(Table(), threshold=0.98)
+    c.put("what is rag", "retrieval augmented generation", ["r"])
+    assert c.get("What is RAG? ") == ("retrieval augmented generation", ["r"])
+    assert c.get("explain rag") is None
+    assert c.get("what is bm25") is None
+
+def test_expired_entries_expire(clock):
+    c = SemanticCache(Table(), ttl=60)
+    c.put("what is rag", "a", [])
+    clock.now += 61
+    assert c.get("what is rag") is None and not c._entries
+
+def test_expired_best_match_does_not_hide_a_valid_one(clock):
+    c = SemanticCache(Table(), threshold=0.95, ttl=60)
+    c.put("what is rag", "old", [])
+    clock.now += 50
+    c.put("explain rag", "fresh", [])
+    clock.now += 20  # "what is rag" (the closer one) expired, "explain rag" has not
+    assert c.get("what is rag") == ("fresh", [])
+
+def test_least_recently_used_is_evicted(clock):
+    c = SemanticCache(Table(), max_entries=2)
+    c.put("what is rag", "rag", [])
+    c.put("what is bm25", "bm25", [])
+    assert c.get("what is rag")  # rag is now the most recently used
+    c.put("what is faiss", "faiss", [])
+    assert c.get("what is bm25") is None
+    assert c.get("what is rag") == ("rag", []) and c.get("what is faiss") == ("faiss", [])
+
+def test_new_index_version_drops_everything(clock):
+    version = ["v1"]
+    c = SemanticCache(Table(), version_fn=lambda: version[0])
+    c.put("what is rag", "rag", [])
+    assert c.get("what is rag")
+    version[0] = "v2"
+    assert c.get("what is rag") is None
+    c.put("what is rag", "rag v2", [])
+    assert c.get("what is rag") == ("rag v2", [])
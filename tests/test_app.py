@@ -0,0 +1,48 @@
+# tests/test_app.py
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import app as service
+
+@pytest.fixture
+def client():
+    return TestClient(service.app)  # no `with`: lifespan (model warm-up) is not run
+
+@pytest.mark.parametrize("body", [{"query": "q", "filter": {"levle": "2"}},
+                                  {"query": "q", "filter": {"level": {"nested": 1}}},
+                                  {"query": "q", "filter": {"type": 1.5}}])
+def test_bad_search_filter_is_a_422(client, body):
+    r = client.post("/search", json=body)
+    assert r.status_code == 422
+
+def test_unknown_field_is_named_in_the_error(client):
+    r = client.post("/search", json={"query": "q", "filter": {"level": "2", "levle": "2"}})
+    assert "levle" in r.json()["detail"]
+
+def test_identical_inflight_calls_are_coalesced():
+    metrics = service.Metrics()
+    gate, calls = service.Coalescer(metrics, "ask"), []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "42"
+
+    async def burst():
+        same = [gate.run("q", answer) for _ in range(5)]
+        return await asyncio.gather(*same, gate.run("other", answer))
+
+    assert asyncio.run(burst()) == ["42"] * 6
+    assert len(calls) == 2 and metrics.counts["ask_coalesced"] == 4
+    assert not gate.inflight  # finished keys are released, the next call runs again
+
+def test_profiling_is_refused_unless_allowed(client, monkeypatch, tmp_path):
+    from agent import agent
+    monkeypatch.setattr(agent, "answer_question", lambda question, use_cache=True: "42")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(service, "ALLOW_PROFILE", False)
+    r = client.post("/ask", json={"question": "q", "profile": True})
+    assert r.status_code == 403 and not (tmp_path / ".cache").exists()
+    monkeypatch.setattr(service, "ALLOW_PROFILE", True)
+    r = client.post("/ask", json={"question": "q", "profile": True})
+    assert r.json()["answer"] == "42" and (tmp_path / r.json()["profile"]).exists()
@@ -0,0 +1,80 @@
+# tests/test_backends.py
+import pytest
+from rag.backends import VectorBackend
+
+def test_incomplete_backend_fails_at_construction():
+    class NoSearch(VectorBackend):
+        pass
+    with pytest.raises(TypeError):
+        NoSearch()
+
+def test_batch_and_plain_search_derive_from_search_with_scores():
+    class Fixed(VectorBackend):
+        def search_with_scores(self, query, k=4, filter=None):
+            return [(f"{query}-{i}", 1.0 - i / 10) for i in range(k)]
+    b = Fixed()
+    assert b.search("q", 2) == ["q-0", "q-1"]
+    assert b.search_many(["a", "b"], 1) == [["a-0"], ["b-0"]]
+
+class TableEmbeddings:
+    """embed_documents / embed_query look texts up in a fixed table of vectors."""
+    def __init__(self, table):
+        self.table = table
+
+    def embed_documents(self, texts):
+        return [self.table[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.table[text]
+
+@pytest.fixture(scope="module")
+def corpus():
+    import numpy as np
+    from langchain_core.documents import Document
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, 32))
+    vecs = centers[rng.integers(0, 64, 10_000)] + 0.3 * rng.normal(size=(10_000, 32))
+    table = {f"doc{i}": v.tolist() for i, v in enumerate(vecs)}
+    queries = [f"q{i}" for i in range(0, 10_000, 250)]
+    for q in queries: table[q] = (vecs[int(q[1:])] + 0.05 * rng.normal(size=32)).tolist()
+    docs = [Document(page_content=f"doc{i}", metadata={"type": "pdf" if i % 3 == 0 else "markdown"})
+            for i in range(len(vecs))]
+    return docs, TableEmbeddings(table), queries
+
+def _ids(hits):
+    return [d.page_content for d, _ in hits]
+
+KIND_CLASS = {"flat": "IndexFlatIP", "sq8": "IndexScalarQuantizer", "ivfsq8": "IndexIVFScalarQuantizer",
+              "ivfpq": "IndexIVFPQ"}
+
+MIN_RECALL = {"flat": 1.0, "sq8": 0.85, "ivfsq8": 0.8, "ivfpq": 0.4}
+
+@pytest.mark.parametrize("kind", list(KIND_CLASS))
+def test_each_kind_reloads_mmapped_with_good_recall(corpus, tmp_path, kind):
+    from rag.backends import FaissBackend, build_faiss
+    from rag.filters import SearchFilter
+    docs, emb, queries = corpus
+    flat = build_faiss(docs, str(tmp_path / "flat"), "flat", m=8, embeddings=emb)
+    build_faiss(docs, str(tmp_path / kind), kind, m=8, embeddings=emb)
+    idx = FaissBackend(str(tmp_path / kind), emb)
+    assert type(idx.index).__name__ == KIND_CLASS[kind]  # 10k vectors: enough to train every kind
+    exact, approx = flat.search_many_with_scores(queries, 10), idx.search_many_with_scores(queries, 10)
+    assert all(f"doc{q[1:]}" in _ids(a) for a, q in zip(approx, queries))  # the near-duplicate is found
+    # overlap with exact top-10; PQ codes blur neighbours inside a tight cluster the most
+    recall = sum(len(set(_ids(a)) & set(_ids(e))) for a, e in zip(approx, exact)) / (10 * len(queries))
+    assert recall >= MIN_RECALL[kind]
+
+    # filtered: IDSelector / subset scan over the rows matching type=pdf (docs 0, 3, 6, ...)
+    pdf = SearchFilter(type="pdf")
+    got = [idx.search_with_scores(q, 10, pdf) for q in queries]
+    assert all(len(hits) == 10 and all(d.metadata["type"] == "pdf" for d, _ in hits) for hits in got)
+    assert all(f"doc{q[1:]}" in _ids(hits) for hits, q in zip(got, queries) if int(q[1:]) % 3 == 0)
+    want = [flat.search_with_scores(q, 10, pdf) for q in queries]
+    recall = sum(len(set(_ids(g)) & set(_ids(w))) for g, w in zip(got, want)) / (10 * len(queries))
+    assert recall >= MIN_RECALL[kind]
+
+def test_unknown_kind_is_rejected(corpus, tmp_path):
+    from rag.backends import build_faiss
+    docs, emb, _ = corpus
+    with pytest.raises(ValueError, match="ivf_pq"):
+        build_faiss(docs[:10], str(tmp_path / "x"), "ivf_pq", embeddings=emb)
@@ -0,0 +1,67 @@
+# tests/test_bm25.py
+import gzip, json
+import pytest
+from langchain_core.documents import Document
+from rag.bm25 import BM25Index
+
+def _docs(texts: dict) -> list[tuple[str, Document]]:
+    return [(i, Document(page_content=t, metadata={"source": i})) for i, t in texts.items()]
+
+CORPUS = {"a": "faiss vector store with ivf index", "b": "chroma vector store persistence",
+          "c": "bm25 lexical retrieval for exact library names", "d": "streamlit user interface"}
+
+def _ranked(idx, query):
+    return [(d.id, round(s, 6)) for d, s in idx.search(query, k=10)]
+
+@pytest.mark.parametrize("query", ["vector store", "faiss bm25 streamlit", "library names"])
+def test_update_scores_match_a_fresh_build(query):
+    idx = BM25Index.build([d for _, d in _docs(CORPUS)], list(CORPUS))
+    idx.update(_docs({"b": "chroma store rebuilt", "e": "new faiss vector notes"}), deletes=["d"])
+    after = {**CORPUS, "b": "chroma store rebuilt", "e": "new faiss vector notes"}
+    del after["d"]
+    fresh = BM25Index.build([d for _, d in _docs(after)], list(after))
+    assert _ranked(idx, query) == _ranked(fresh, query)
+
+def test_deleted_rows_are_compacted_and_survive_save(tmp_path):
+    idx = BM25Index.build([d for _, d in _docs(CORPUS)], list(CORPUS))
+    idx.update(deletes=["a", "b"])
+    assert None not in idx.docs and len(idx.docs) == 2
+    path = str(tmp_path / "bm25.json.gz")
+    idx.save(path)
+    loaded = BM25Index.load(path)
+    assert _ranked(loaded, "streamlit lexical") == _ranked(idx, "streamlit lexical")
+    assert [d.id for d, _ in loaded.search("store", filter=None)] == []
+
+def test_loads_files_with_precomputed_weights(tmp_path):
+    path = str(tmp_path / "old.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"docs": [[i, t, {}] for i, t in CORPUS.items()], "postings": {"faiss": [[0, 1.2]]}}, f)
+    assert _ranked(BM25Index.load(path), "faiss")[0][0] == "a"
+
+def _levelled(n: int) -> BM25Index:
+    docs = [Document(page_content=f"retrieval notes {'faiss ' * (i % 3)}chunk {i}",
+                     metadata={"type": "pdf", "level": f"Level {i % 4}: Topic", "level_id": str(i % 4)})
+            for i in range(n)]
+    return BM25Index.build(docs, [str(i) for i in range(n)])
+
+@pytest.mark.parametrize("level", ["Level 2", "2", 2, ["Level 1: Topic", 3]])
+def test_filtered_search_scores_only_matching_rows(level):
+    from rag.filters import SearchFilter
+    idx, f = _levelled(400), SearchFilter(level=level)
+    hits = idx.search("faiss retrieval", k=500, filter=f)
+    expected = [(d.id, s) for d, s in idx.search("faiss retrieval", k=500) if f.matches(d.metadata)]
+    assert [(d.id, round(s, 9)) for d, s in hits] == [(i, round(s, 9)) for i, s in expected]
+
+def test_small_filter_skips_the_posting_scan(monkeypatch):
+    from rag.filters import SearchFilter
+    idx = _levelled(400)
+    idx.docs[7][2]["repo"] = "o/r"
+    # "retrieval" occurs in all 400 rows: one matching row must not mean 400 membership checks
+    class Rows(set):
+        checks = 0
+        def __contains__(self, x):
+            Rows.checks += 1
+            return super().__contains__(x)
+    monkeypatch.setattr(idx, "rows_matching", lambda f: Rows({7}))
+    hits = idx.search("retrieval", k=5, filter=SearchFilter(repo="o/r"))
+    assert [d.id for d, _ in hits] == ["7"] and Rows.checks == 0
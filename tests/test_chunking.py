@@ -0,0 +1,43 @@
+# tests/test_chunking.py
+from langchain_core.documents import Document
+from rag.chunking import split_and_tag
+
+def _words(n: int, word: str = "lorem") -> str:
+    return " ".join([word] * n)
+
+def test_chunk_ids_are_unique_across_videos_and_repos():
+    docs = [Document(page_content=_words(800, f"w{v}"), metadata={"source": "youtube", "video_id": v})
+            for v in ("a", "b")]
+    docs += [Document(page_content=_words(400), metadata={"source": "github", "repo": r, "path": "README.md"})
+             for r in ("o/x", "o/y")]
+    chunks = split_and_tag(docs)
+    assert len(chunks) > 4
+    assert len({c.metadata["chunk_id"] for c in chunks}) == len(chunks)
+
+def test_labels_do_not_leak_between_videos():
+    docs = [Document(page_content="Level 2: Retrieval\n" + _words(300), metadata={"source": "youtube", "video_id": "a"}),
+            Document(page_content=_words(300), metadata={"source": "youtube", "video_id": "b"})]
+    chunks = split_and_tag(docs)
+    assert {c.metadata.get("level") for c in chunks if c.metadata["video_id"] == "a"} == {"Level 2: Retrieval"}
+    assert all("level" not in c.metadata for c in chunks if c.metadata["video_id"] == "b")
+
+def test_labels_carry_over_between_pages_of_one_pdf():
+    docs = [Document(page_content="Level 1: Basics\nSection 2: Loaders\n" + _words(50), metadata={"source": "l1.pdf", "page": 0}),
+            Document(page_content=_words(50), metadata={"source": "l1.pdf", "page": 1})]
+    page2 = split_and_tag(docs)[-1].metadata
+    assert (page2["level"], page2["section"]) == ("Level 1: Basics", "Section 2: Loaders")
+
+def test_first_chunk_reads_labels_from_its_head():
+    text = "Welcome to the bootcamp notes.\nSection 3: Vector stores\n" + _words(40)
+    first = split_and_tag([Document(page_content=text, metadata={"source": "notes.md"})])[0].metadata
+    assert first["section"] == "Section 3: Vector stores"
+    assert first["reference_text"] == "Level ?, Section 3: Vector stores"
+
+def test_level_and_section_ids_are_normalised():
+    from rag.filters import SearchFilter
+    doc = Document(page_content="Level 02: Retrieval\nSection 3 - BM25\n" + _words(50),
+                   metadata={"source": "notes.md"})
+    meta = split_and_tag([doc])[0].metadata
+    assert meta["level"].startswith("Level 02") and meta["level_id"] == "2" and meta["section_id"] == "3"
+    assert SearchFilter(level="Level 2", section=3).matches(meta)
+    assert not SearchFilter(level="Level 3").matches(meta)
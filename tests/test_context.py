@@ -0,0 +1,37 @@
+# tests/test_context.py
+from langchain_core.documents import Document
+from rag.context import merge_adjacent
+
+def _chunk(text, index, **meta):
+    return Document(page_content=text, metadata={"chunk_index": index, **meta})
+
+def test_neighbours_of_one_document_are_stitched():
+    docs = [_chunk("alpha beta gamma delta epsilon zeta", 0, source="a.pdf", page=1),
+            _chunk("gamma delta epsilon zeta eta theta", 1, source="a.pdf", page=1)]
+    merged = merge_adjacent(docs)
+    assert [d.page_content for d in merged] == ["alpha beta gamma delta epsilon zeta eta theta"]
+
+def test_splitter_chunks_stitch_back_to_the_original():
+    from rag.chunking import SPLITTER
+    text = " ".join(f"word{i % 97} and data{i % 13}." for i in range(600))
+    parts = SPLITTER.split_text(text)
+    assert len(parts) > 2
+    merged = merge_adjacent([_chunk(p, i, source="n.md") for i, p in enumerate(parts)])
+    assert [d.page_content for d in merged] == [text]
+
+def test_chunks_without_real_overlap_are_not_glued_together():
+    docs = [_chunk("we index the notes and", 0, source="a.md"),
+            _chunk("data flows into the vectorstore_persist_directory", 1, source="a.md"),
+            _chunk("store_persist_directory is set in rag.index", 2, source="a.md")]  # 23 shared chars, from mid-word
+    merged = merge_adjacent(docs)[0].page_content
+    assert merged == ("we index the notes and\ndata flows into the vectorstore_persist_directory\n"
+                      "store_persist_directory is set in rag.index")
+
+def test_different_videos_and_repos_are_not_merged():
+    docs = [_chunk("intro to rag", 0, source="youtube", video_id="v1"),
+            _chunk("faiss tuning", 1, source="youtube", video_id="v2"),
+            _chunk("readme one", 0, source="github", repo="o/a", path="README.md"),
+            _chunk("readme two", 1, source="github", repo="o/b", path="README.md")]
+    merged = merge_adjacent(docs)
+    assert [d.page_content for d in merged] == [d.page_content for d in docs]
+    assert [d.metadata.get("video_id") or d.metadata["repo"] for d in merged] == ["v1", "v2", "o/a", "o/b"]
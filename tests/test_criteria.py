@@ -0,0 +1,40 @@
+# tests/test_criteria.py
+import re
+import pytest
+from evaluator.criteria import CriteriaMatcher
+from evaluator.repo_eval_phase1 import PHASE_ONE_CRITERIA
+
+def baseline(criteria: dict, files: list[tuple[str, str]]) -> dict:
+    # what heuristic_scan did before the matcher: one re.search per pattern over all files
+    big = "".join(f"\n\n## {p}\n{t}" for p, t in files)
+    return {crit: any(re.search(p, big, re.I) for p in pats) for crit, pats in criteria.items()}
+
+def matched(criteria: dict, files: list[tuple[str, str]]) -> CriteriaMatcher:
+    m = CriteriaMatcher(criteria)
+    for p, t in files: m.feed(p, t)
+    return m
+
+CASES = [
+    ({"Embeddings": ["Embeddings"], "OpenAI": ["OpenAIEmbeddings"]}, [("a.py", "OpenAIEmbeddings")]),
+    ({"OpenAI": ["OpenAIEmbeddings"], "Embeddings": ["Embeddings"]}, [("a.py", "x = OpenAIEmbeddings()")]),
+    ({"chunk": ["chunk"], "size": ["chunk_size"]}, [("a.py", "chunk_size=500")]),  # same start
+    ({"store": ["Chroma", "FAISS"], "db": ["Chroma.from_documents"]}, [("a.py", "db = Chroma.from_documents(d)")]),
+    (PHASE_ONE_CRITERIA, [("app.py", "import streamlit\nfrom langchain.chains import RetrievalQA\n"),
+                          ("nb.ipynb", "HuggingFaceEmbeddings\nvs.as_retriever()\nRecursiveCharacterTextSplitter")]),
+    (PHASE_ONE_CRITERIA, [("README.md", "nothing relevant here")]),
+]
+
+@pytest.mark.parametrize("criteria, files", CASES)
+def test_results_equal_one_search_per_criterion(criteria, files):
+    assert matched(criteria, files).results() == baseline(criteria, files)
+
+def test_overlapping_patterns_keep_their_own_evidence():
+    m = matched({"Embeddings": ["Embeddings"], "OpenAI": ["OpenAIEmbeddings"]},
+                [("a.py", "import os\nemb = OpenAIEmbeddings()\n")])
+    assert m.evidence == {"OpenAI": ("a.py", 2, "OpenAIEmbeddings"), "Embeddings": ("a.py", 2, "Embeddings")}
+
+def test_first_hit_wins_and_paths_count_as_line_zero():
+    m = matched({"ui": ["streamlit"], "store": ["FAISS"]},
+                [("streamlit_app.py", "x\nFAISS\nFAISS"), ("b.py", "FAISS")])
+    assert m.evidence == {"ui": ("streamlit_app.py", 0, "streamlit"), "store": ("streamlit_app.py", 2, "FAISS")}
+    assert m.done
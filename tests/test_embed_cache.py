@@ -0,0 +1,96 @@
+# tests/test_embed_cache.py
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from rag.embed_cache import CachedEmbeddings
+
+class Counting(Embeddings):
+    """Vector = [len(text), first char code, i]; records every text embedded."""
+    model_name = "counting"
+
+    def __init__(self):
+        self.seen = []
+
+    def embed_documents(self, texts):
+        self.seen += texts
+        return [[float(len(t)), float(ord(t[0])), 0.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), float(ord(text[0])), 1.0]
+
+def _cache(tmp_path, max_entries=4, inner=None):
+    return CachedEmbeddings(inner or Counting(), cache_dir=str(tmp_path), max_entries=max_entries)
+
+def test_hits_skip_the_model(tmp_path):
+    c = _cache(tmp_path)
+    first = c.embed_documents(["ab", "cde", "ab"])
+    assert c.inner.seen == ["ab", "cde"]  # repeated text embedded once
+    assert c.embed_documents(["cde", "ab"]) == [first[1], first[0]]
+    assert c.inner.seen == ["ab", "cde"]
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    c = _cache(tmp_path, max_entries=3)
+    c.embed_documents(["a", "b", "c"])
+    c.embed_documents(["a"])           # b is now the oldest
+    c.embed_documents(["d"])
+    c.inner.seen.clear()
+    c.embed_documents(["a", "c", "d"])
+    assert c.inner.seen == []
+    c.embed_documents(["b"])
+    assert c.inner.seen == ["b"]
+
+def test_reopen_keeps_entries(tmp_path):
+    _cache(tmp_path).embed_documents(["ab", "cd"])
+    c = _cache(tmp_path)
+    assert c.embed_documents(["ab", "cd"]) == [[2.0, 97.0, 0.0], [2.0, 99.0, 0.0]] and c.inner.seen == []
+
+def test_reopen_with_a_larger_capacity_grows_the_file(tmp_path):
+    _cache(tmp_path, max_entries=2).embed_documents(["ab", "cd"])
+    c = _cache(tmp_path, max_entries=5)
+    assert c.embed_documents(["ab"]) == [[2.0, 97.0, 0.0]]
+    c.embed_documents(["e", "f", "g"])
+    c.inner.seen.clear()
+    c.embed_documents(["ab", "cd", "e", "f", "g"])
+    assert c.inner.seen == []
+
+def test_reopen_with_a_smaller_capacity_drops_rows_past_the_end(tmp_path):
+    _cache(tmp_path, max_entries=4).embed_documents(["a", "b", "c", "d"])
+    c = _cache(tmp_path, max_entries=2)
+    assert c.embed_documents(["a", "b"]) == [[1.0, 97.0, 0.0], [1.0, 98.0, 0.0]] and c.inner.seen == []
+    assert c.embed_documents(["c", "d"]) and c.inner.seen == ["c", "d"]  # re-embedded, no IndexError
+
+def test_concurrent_misses_on_one_key_share_a_slot(tmp_path):
+    c, start = _cache(tmp_path, max_entries=8), threading.Barrier(4)
+
+    def miss():
+        start.wait()
+        c.embed_documents(["same"])
+
+    threads = [threading.Thread(target=miss) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    rows = c._db.execute("SELECT slot FROM entries").fetchall()
+    assert len(rows) == 1 and (c._meta("next_slot") or 0) == 1  # no orphaned slots
+
+def test_queries_and_documents_are_cached_apart(tmp_path):
+    c = _cache(tmp_path)
+    assert c.embed_query("ab")[2] == 1.0 and c.embed_documents(["ab"])[0][2] == 0.0
+    assert np.allclose(c.embed_query("ab"), [2.0, 97.0, 1.0])
+
+def test_batched_queries_use_the_query_path_of_asymmetric_models(tmp_path):
+    c = _cache(tmp_path)  # Counting.embed_query differs from embed_documents (a query prefix, say)
+    assert c.embed_queries(["ab", "cd"]) == [[2.0, 97.0, 1.0], [2.0, 99.0, 1.0]]
+    assert c.embed_query("ab") == [2.0, 97.0, 1.0] and c.inner.seen == []
+
+def test_symmetric_models_batch_queries_as_documents():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from rag.embed_cache import query_vectors
+
+    class Model(HuggingFaceEmbeddings):
+        def embed_documents(self, texts):
+            calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    calls = []
+    assert query_vectors(Model.model_construct(), ["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+    assert calls == [["a", "bb", "ccc"]]  # one batch
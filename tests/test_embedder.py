@@ -0,0 +1,41 @@
+# tests/test_embedder.py
+import numpy as np
+from langchain_core.documents import Document
+from rag import embedder
+from rag.index import upsert_vectors
+
+def test_worker_pool_is_reused_until_shutdown():
+    # executors start processes lazily, so no model is loaded here
+    pool = embedder._pool("m", 2, 1)
+    assert embedder._pool("m", 2, 1) is pool
+    assert embedder._pool("m", 2, 2) is not pool
+    embedder.shutdown_pools()
+    assert not embedder._POOLS
+    assert embedder._pool("m", 2, 1) is not pool
+    embedder.shutdown_pools()
+
+class FakeStore:
+    def __init__(self):
+        self.rows = {}
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None):
+        for i, (text, vec), meta in zip(ids, text_embeddings, metadatas):
+            self.rows[i] = (text, vec, meta)
+
+def test_upsert_vectors_falls_back_to_public_api():
+    vs = FakeStore()
+    docs = [Document(page_content="a", metadata={"k": 1}), Document(page_content="b")]
+    upsert_vectors(vs, ["x", "y"], np.eye(2, dtype=np.float32), docs)
+    assert vs.rows["x"] == ("a", [1.0, 0.0], {"k": 1})
+    assert vs.rows["y"][0] == "b"
+
+def test_upsert_vectors_replaces_existing_faiss_ids():
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    emb = DeterministicFakeEmbedding(size=8)
+    vs = FAISS.from_texts(["old a", "old b"], emb, ids=["x", "y"])
+    docs = [Document(page_content="new a"), Document(page_content="c")]
+    upsert_vectors(vs, ["x", "z"], np.asarray(emb.embed_documents(["new a", "c"]), dtype=np.float32), docs)
+    got = {i: vs.docstore.search(i).page_content for i in vs.index_to_docstore_id.values()}
+    assert got == {"x": "new a", "y": "old b", "z": "c"} and vs.index.ntotal == 3
+    assert vs.similarity_search("new a", 1)[0].page_content == "new a"
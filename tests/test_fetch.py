@@ -0,0 +1,119 @@
+# tests/test_fetch.py
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from rag import fetch
+
+class Scripted:
+    """Answers GETs from `script`: a list of (status, body, headers, delay) popped per request;
+    the last entry repeats. Request headers are kept in `seen`."""
+    def __init__(self, *script):
+        self.script, self.seen = list(script), []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.seen.append(dict(self.headers))
+                status, body, headers, delay = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                time.sleep(delay)
+                try:
+                    self.send_response(status)
+                    for k, v in headers.items(): self.send_header(k, v)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:  # client gave up (timeout)
+                    pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/x"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+def ok(body=b"hello", headers=None, delay=0.0):
+    return 200, body, headers or {}, delay
+
+@pytest.fixture
+def serve():
+    servers = []
+    def start(*script):
+        servers.append(Scripted(*script))
+        return servers[-1]
+    yield start
+    for s in servers: s.server.shutdown()
+
+def test_etag_revalidation_returns_cached_body(serve, fetcher):
+    s = serve(ok(headers={"ETag": '"v1"'}), (304, b"", {}, 0.0))
+    assert fetcher.get(s.url).text == "hello"
+    r = fetcher.get(s.url)
+    assert r.text == "hello" and r.from_cache
+    assert s.seen[1]["If-None-Match"] == '"v1"'
+
+def test_fresh_copy_skips_the_request(serve, fetcher):
+    s = serve(ok())
+    fetcher.get(s.url)
+    assert fetcher.get(s.url, max_age=60).text == "hello"
+    assert len(s.seen) == 1
+
+def test_rate_limit_backs_off_then_succeeds(serve, fetcher):
+    s = serve((429, b"", {"Retry-After": "0"}, 0.0),
+              (403, b"", {"X-RateLimit-Remaining": "0", "Retry-After": "0"}, 0.0), ok())
+    assert fetcher.get(s.url).text == "hello"
+    assert len(s.seen) == 3
+
+def test_read_timeout_is_retried(serve, fetcher):
+    s = serve(ok(delay=1.0), ok())
+    assert fetcher.get(s.url, timeout=0.2).text == "hello"
+    assert len(s.seen) == 2
+
+def test_persistent_failure_serves_stale_copy_of_immutable_urls_only(serve, fetcher):
+    s = serve(ok(), (503, b"", {}, 0.0))
+    fetcher.get(s.url)
+    r = fetcher.get(s.url, immutable=True)
+    assert r.ok and r.from_cache and len(s.seen) == 1 + fetch.RETRIES + 1
+    r = fetcher.get(s.url)  # e.g. /commits/HEAD: an old answer would be wrong
+    assert r.status_code == 503 and not r.from_cache
+
+def test_throttled_mutable_url_is_not_answered_from_cache(serve, fetcher):
+    s = serve(ok(), (429, b"", {"Retry-After": "0"}, 0.0))
+    fetcher.get(s.url)
+    assert fetcher.get(s.url).status_code == 429
+
+def test_unreachable_mutable_url_raises_despite_a_copy(serve, fetcher):
+    s = serve(ok())
+    fetcher.get(s.url)
+    s.server.shutdown(); s.server.server_close()
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get(s.url, timeout=0.5)
+    assert fetcher.get(s.url, timeout=0.5, immutable=True).text == "hello"
+
+def test_cache_is_keyed_by_accept_header(serve, fetcher):
+    s = serve(ok(b"sha"), ok(b'{"sha": 1}'), ok(b"never"))
+    assert fetcher.get(s.url, {"Accept": "application/vnd.github.sha"}, max_age=60).text == "sha"
+    assert fetcher.get(s.url, {"Accept": "application/json"}, max_age=60).text == '{"sha": 1}'
+    assert fetcher.get(s.url, {"Accept": "application/vnd.github.sha"}, max_age=60).text == "sha"
+    assert len(s.seen) == 2
+
+def test_authorised_responses_are_not_shared(serve, fetcher, monkeypatch, tmp_path):
+    s = serve(ok(b"private"), ok(b"public"))
+    monkeypatch.setattr(fetch, "API_BASE", s.url.rsplit("/", 1)[0])
+    monkeypatch.delenv("GH_TOKEN", raising=False); monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    with_token = fetch.Fetcher(str(tmp_path / "shared.sqlite"), token="t0ken")
+    without = fetch.Fetcher(str(tmp_path / "shared.sqlite"))
+    assert with_token.get(s.url, max_age=60).text == "private"
+    assert s.seen[0]["Authorization"] == "Bearer t0ken"
+    assert without.get(s.url, max_age=60).text == "public"
+
+def test_unreachable_without_copy_raises(serve, fetcher):
+    s = serve(ok())
+    s.server.shutdown(); s.server.server_close()
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get(s.url, timeout=0.5)
+
+def test_uncached_get_leaves_no_copy(serve, fetcher):
+    s = serve(ok())
+    assert fetcher.get(s.url, cache=False).text == "hello"
+    assert fetcher.cached(s.url) is None
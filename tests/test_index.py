@@ -0,0 +1,85 @@
+# tests/test_index.py
+import hashlib, os
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rag import registry
+from rag.embed_cache import CachedEmbeddings
+from rag.index import EMB_MODEL, ingest_incremental, load_manifest
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic 8-d vectors from a text hash; records every text embedded."""
+    model_name = "fake"
+
+    def __init__(self):
+        self.seen = []
+
+    def embed_documents(self, texts):
+        self.seen += texts
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        return [b / 255 for b in hashlib.md5(text.encode()).digest()[:8]]
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    from langchain_chroma import Chroma
+    inner, persist = FakeEmbeddings(), str(tmp_path / "vs")
+    emb = CachedEmbeddings(inner, cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setitem(registry._RESOURCES, ("embeddings", EMB_MODEL), emb)
+    monkeypatch.setitem(registry._RESOURCES, ("chroma", os.path.abspath(persist)),
+                        Chroma(embedding_function=emb, persist_directory=persist))
+    return persist, inner
+
+def _docs(source, texts):
+    return [Document(page_content=t, metadata={"source": source, "chunk_index": i}) for i, t in enumerate(texts)]
+
+A = ["alpha one", "alpha two", "alpha three", "alpha four"]
+B = ["beta one", "beta two"]
+
+def _counts(st):
+    return st["added"], st["updated"], st["deleted"], st["skipped"]
+
+def _stored(persist):
+    return sorted(registry.chroma(persist).get(include=["documents"])["documents"])
+
+def test_unchanged_corpus_is_skipped(store):
+    persist, inner = store
+    assert _counts(ingest_incremental(_docs("a.md", A) + _docs("b.md", B), persist)) == (6, 0, 0, 0)
+    inner.seen.clear()
+    assert _counts(ingest_incremental(_docs("a.md", A) + _docs("b.md", B), persist)) == (0, 0, 0, 6)
+    assert inner.seen == [] and _stored(persist) == sorted(A + B)
+
+def test_inserted_chunk_does_not_reembed_the_rest(store):
+    persist, inner = store
+    ingest_incremental(_docs("a.md", A), persist)
+    ids = set(load_manifest(persist)["a.md"]["chunks"])
+    inner.seen.clear()
+    st = ingest_incremental(_docs("a.md", ["alpha zero"] + A), persist)
+    # the later chunks keep their ids; only their chunk_index moved
+    assert _counts(st) == (1, 4, 0, 0) and inner.seen == ["alpha zero"]
+    assert ids < set(load_manifest(persist)["a.md"]["chunks"])
+    assert sorted(registry.chroma(persist).get(ids=list(ids))["documents"]) == sorted(A)
+    assert _stored(persist) == sorted(["alpha zero"] + A)
+
+def test_changed_chunk_replaces_the_old_one(store):
+    persist, inner = store
+    ingest_incremental(_docs("a.md", A) + _docs("b.md", B), persist)
+    inner.seen.clear()
+    st = ingest_incremental(_docs("a.md", ["alpha one", "alpha 2", "alpha three", "alpha four"]) + _docs("b.md", B),
+                            persist)
+    assert _counts(st) == (1, 0, 1, 5) and inner.seen == ["alpha 2"]
+    assert _stored(persist) == sorted(["alpha one", "alpha 2", "alpha three", "alpha four"] + B)
+
+def test_deleted_chunks_and_sources_are_dropped(store):
+    persist, _ = store
+    ingest_incremental(_docs("a.md", A) + _docs("b.md", B), persist)
+    st = ingest_incremental(_docs("a.md", A[:3]), persist)
+    assert _counts(st) == (0, 0, 3, 3)
+    assert _stored(persist) == sorted(A[:3]) and set(load_manifest(persist)) == {"a.md"}
+
+def test_repeated_text_in_a_source_gets_distinct_ids(store):
+    persist, _ = store
+    st = ingest_incremental(_docs("a.md", ["same", "other", "same"]), persist)
+    assert st["added"] == 3 and len(load_manifest(persist)["a.md"]["chunks"]) == 3
+    assert _stored(persist) == ["other", "same", "same"]
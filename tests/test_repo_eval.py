@@ -0,0 +1,93 @@
+# tests/test_repo_eval.py
+import asyncio, threading, time
+import pytest
+import requests
+from evaluator import repo_eval_async as ra
+from evaluator import repo_eval_phase1 as p1
+
+RUBRIC = {"Vector store used": [r"FAISS", r"Chroma"], "User interaction": [r"streamlit"]}
+
+def test_unchanged_commit_is_answered_from_the_cache(github, eval_cache):
+    github.files = {"app.py": "import streamlit\nvs = FAISS.from_texts(t, e)\n"}
+    m, _ = p1.scan_repo("o/r", RUBRIC, eval_cache)
+    assert m.results() == {"Vector store used": True, "User interaction": True}
+    github.hits.clear()
+    m, _ = p1.scan_repo("o/r", RUBRIC, eval_cache)
+    assert m.evidence["Vector store used"] == ("app.py", 2, "FAISS")
+    assert len(github.hits) == 1  # only the HEAD lookup
+
+def test_failed_file_fetch_is_not_cached(github, eval_cache):
+    github.files = {"app.py": "import streamlit\n", "rag.py": "Chroma()\n"}
+    github.fail["rag.py"] = 403
+    m, _ = p1.scan_repo("o/r", RUBRIC, eval_cache)
+    assert m.missing == ["rag.py"] and not m.results()["Vector store used"]
+    assert eval_cache.result(github.commit(), p1.rubric_key(RUBRIC)) is None
+    del github.fail["rag.py"]
+    m, _ = p1.scan_repo("o/r", RUBRIC, eval_cache)
+    assert not m.missing and m.results()["Vector store used"]
+    assert eval_cache.result(github.commit(), p1.rubric_key(RUBRIC)) is not None
+
+def test_rate_limited_tree_is_not_cached(github, eval_cache):
+    github.files = {"app.py": "import streamlit\n"}
+    github.fail["tree"] = 403
+    m, _ = p1.scan_repo("o/r", RUBRIC, eval_cache)
+    assert m.missing == [p1.TREE]
+    assert eval_cache.result(github.commit(), p1.rubric_key(RUBRIC)) is None
+
+def test_async_scan_matches_sync_and_skips_partial_results(github, eval_cache):
+    github.files = {f"f{i}.py": "x = 1\n" for i in range(20)}
+    github.files["ui.py"] = "import streamlit"
+    github.fail["f3.py"] = 500
+    m, excerpt = asyncio.run(ra.scan_repo_async("o/r", ra.AsyncFetcher(), RUBRIC, eval_cache))
+    assert m.results() == {"Vector store used": False, "User interaction": True}
+    assert m.missing == ["f3.py"] and "## ui.py" in excerpt
+    assert eval_cache.result(github.commit(), p1.rubric_key(RUBRIC)) is None
+
+class FakeLLM:
+    """ainvoke-only stand-in that records how many calls overlap; fails for repos named "*/broken"."""
+    def __init__(self):
+        self.calls, self.active, self.peak = 0, 0, 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1; self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        if "/broken" in prompt: raise RuntimeError("model down")
+        return "fix it"
+
+def test_batch_fanout_is_bounded_and_a_failing_repo_does_not_sink_it(github, eval_cache, monkeypatch):
+    from evaluator import cache
+    monkeypatch.setattr(cache, "_DEFAULT", eval_cache)
+    github.files = {"app.py": "import streamlit\n"}
+    github.fail["head"] = 404  # no commit to cache under: every repo is graded
+    names, llm = ["o/a", "o/broken", "o/b", "o/c", "o/d"], FakeLLM()
+    reports = asyncio.run(ra.evaluate_repos_async(names, fanout=2, llm=llm))
+    assert llm.calls == 5 and llm.peak == 2
+    assert reports["o/broken"].startswith("Evaluation failed: RuntimeError")
+    assert all(reports[n].endswith("Feedback:\nfix it") for n in names if n != "o/broken")
+
+def test_blob_fetches_are_capped_per_host(github, eval_cache, monkeypatch):
+    github.files = {f"f{i}.py": "x = 1\n" for i in range(12)}
+    state, lock, real = {"active": 0, "peak": 0}, threading.Lock(), p1.fetch_blob
+
+    def counting(*args):
+        with lock:
+            state["active"] += 1; state["peak"] = max(state["peak"], state["active"])
+        try:
+            time.sleep(0.02)
+            return real(*args)
+        finally:
+            with lock: state["active"] -= 1
+
+    monkeypatch.setattr(p1, "fetch_blob", counting)
+    m, _ = asyncio.run(ra.scan_repo_async("o/r", ra.AsyncFetcher(per_host=3), RUBRIC, eval_cache))
+    assert not m.missing and state["peak"] == 3
+
+def test_throttled_head_is_an_error_not_the_old_commit(github, eval_cache):
+    github.files = {"app.py": "import streamlit\n"}
+    p1.scan_repo("o/r", RUBRIC, eval_cache)
+    github.files["rag.py"] = "FAISS\n"  # resubmission with a new commit
+    github.fail["head"] = 503
+    with pytest.raises(requests.HTTPError):
+        p1.scan_repo("o/r", RUBRIC, eval_cache)
@@ -0,0 +1,91 @@
+# tests/test_repo_index.py
+import hashlib, os
+import pytest
+from langchain_core.embeddings import Embeddings
+from rag import registry
+from rag.bm25 import BM25_FILE, BM25Index
+from rag.index import EMB_MODEL
+from evaluator import repo_eval_phase1 as p1
+from evaluator import repo_index as ri
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic 8-d vectors from a text hash; counts embedded texts."""
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        return [b / 255 for b in hashlib.md5(text.encode()).digest()[:8]]
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, github):
+    from langchain_chroma import Chroma
+    emb, persist = FakeEmbeddings(), str(tmp_path / "repos")
+    vs = Chroma(embedding_function=emb, persist_directory=persist)
+    monkeypatch.setitem(registry._RESOURCES, ("embeddings", EMB_MODEL), emb)
+    monkeypatch.setitem(registry._RESOURCES, ("chroma", os.path.abspath(persist)), vs)
+    return persist, vs, emb
+
+def _paths(vs) -> dict[str, int]:
+    out = {}
+    for m in vs.get(include=["metadatas"])["metadatas"]: out[m["path"]] = out.get(m["path"], 0) + 1
+    return out
+
+def _bm25_paths(persist) -> set[str]:
+    idx = BM25Index.load(f"{persist}/{BM25_FILE}")
+    return {d[2]["path"] for d in idx.docs if d is not None}
+
+FILES = {"app.py": "import streamlit as st\n\ndef main():\n    st.title('rag')\n",
+         "notes.md": "# Notes\nChroma persistence and BM25 retrieval.\n",
+         "rag.py": "from langchain_chroma import Chroma\n\nclass Store:\n    pass\n"}
+
+def test_sync_reembeds_only_changed_files(store, github, eval_cache):
+    persist, vs, emb = store
+    github.files = dict(FILES)
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert st["files_indexed"] == 3 and not st["missing"]
+    assert set(_paths(vs)) == set(FILES) == _bm25_paths(persist)
+
+    github.hits.clear(); emb.embedded = 0
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert st["files_skipped"] == 3 and emb.embedded == 0
+    assert len(github.hits) == 1  # unchanged HEAD: nothing but the commit lookup
+
+    github.files["notes.md"] = "# Notes\nFAISS instead.\n"
+    del github.files["app.py"]
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert (st["files_indexed"], st["files_deleted"], st["files_skipped"]) == (1, 1, 1)
+    assert set(_paths(vs)) == {"notes.md", "rag.py"} == _bm25_paths(persist)
+    assert any("FAISS" in d for d in vs.get(where={"path": "notes.md"})["documents"])
+
+def test_failed_download_keeps_old_chunks_and_is_retried(store, github, eval_cache):
+    persist, vs, _ = store
+    github.files = dict(FILES)
+    ri.index_repos(["o/r"], persist, eval_cache)
+    github.files["rag.py"] = "import faiss\n"
+    github.files["new.md"] = "brand new"
+    github.fail.update({"rag.py": 500, "new.md": 403})
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert sorted(st["missing"]) == ["new.md", "rag.py"] and st["files_deleted"] == 0
+    assert set(_paths(vs)) == set(FILES)  # rag.py still searchable with its old content
+    manifest = ri.load_manifest(persist, ri.REPO_MANIFEST)["o/r"]
+    assert manifest["commit"] is None and "new.md" not in manifest["files"]
+
+    github.fail.clear()
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert st["files_indexed"] == 2 and not st["missing"]
+    assert set(_paths(vs)) == set(FILES) | {"new.md"} == _bm25_paths(persist)
+    assert ri.load_manifest(persist, ri.REPO_MANIFEST)["o/r"]["commit"] == github.commit()
+
+def test_failed_tree_deletes_nothing(store, github, eval_cache):
+    persist, vs, _ = store
+    github.files = dict(FILES)
+    ri.index_repos(["o/r"], persist, eval_cache)
+    github.files["extra.md"] = "changes the commit"
+    github.fail["tree"] = 403
+    st = ri.index_repos(["o/r"], persist, eval_cache)["o/r"]
+    assert st["missing"] == [p1.TREE] and st["files_deleted"] == 0
+    assert set(_paths(vs)) == set(FILES)
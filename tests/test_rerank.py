@@ -0,0 +1,74 @@
+# tests/test_rerank.py
+import pytest
+from langchain_core.documents import Document
+from rag import rerank
+from rag.rerank import Reranker
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+class FakeCrossEncoder:
+    """Scores a pair by the number in its text; each pair costs `ms` of (fake) time."""
+    def __init__(self, clock, ms=1.0):
+        self.clock, self.ms, self.pairs = clock, ms, []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs += [t for _, t in pairs]
+        self.clock.now += self.ms * len(pairs) / 1000
+        return [float(t.split()[-1]) for _, t in pairs]
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(rerank.time, "perf_counter", c.perf_counter)
+    return c
+
+TEXTS = [f"chunk {n}" for n in (3, 41, 7, 12, 29, 5, 48, 1, 33, 20, 9, 36, 15, 44, 2, 27, 18, 39, 11, 24)]
+
+def _docs(texts):
+    return [Document(page_content=t) for t in texts]
+
+def test_within_budget_reorders_and_caches(clock):
+    model = FakeCrossEncoder(clock)
+    r = Reranker(model, batch_size=8)
+    top = r.rerank("q", _docs(TEXTS), 3, budget_ms=100)
+    assert [d.page_content for d in top] == ["chunk 48", "chunk 44", "chunk 41"]
+    assert r.ms_per_pair == pytest.approx(1.0)
+    assert r.score("q", TEXTS, budget_ms=100) == [float(t.split()[1]) for t in TEXTS]
+    assert len(model.pairs) == len(TEXTS)  # second call served from the cache
+
+def test_predicted_over_budget_keeps_retrieval_order(clock):
+    model = FakeCrossEncoder(clock)
+    r = Reranker(model, batch_size=8)
+    r.ms_per_pair = 10.0  # 20 uncached pairs -> 200 ms predicted
+    top = r.rerank("q", _docs(TEXTS), 3, budget_ms=150)
+    assert [d.page_content for d in top] == TEXTS[:3] and model.pairs == []
+    assert r.ms_per_pair == pytest.approx(9.0)  # decayed, so re-ranking comes back
+
+def test_cached_pairs_do_not_count_towards_the_prediction(clock):
+    model = FakeCrossEncoder(clock)
+    r = Reranker(model, batch_size=8)
+    r.score("q", TEXTS[:18])
+    r.ms_per_pair = 10.0  # only the 2 uncached pairs are predicted: 20 ms
+    assert r.score("q", TEXTS, budget_ms=50) is not None
+    assert model.pairs[18:] == TEXTS[18:]
+
+def test_over_budget_mid_scoring_aborts_and_keeps_finished_batches(clock):
+    model = FakeCrossEncoder(clock, ms=10.0)
+    r = Reranker(model, batch_size=8)
+    top = r.rerank("q", _docs(TEXTS), 3, budget_ms=50)  # the first batch alone takes 80 ms
+    assert [d.page_content for d in top] == TEXTS[:3]
+    assert len(model.pairs) == 8 and r.ms_per_pair == pytest.approx(10.0)
+    # the abandoned call's batch is cached: finishing without a budget scores only the rest
+    scores = r.score("q", TEXTS, budget_ms=None)
+    assert scores == [float(t.split()[1]) for t in TEXTS]
+    assert len(model.pairs) == len(TEXTS) and len(set(model.pairs)) == len(TEXTS)
+
+def test_overrun_on_the_last_batch_still_returns_scores(clock):
+    model = FakeCrossEncoder(clock, ms=10.0)
+    r = Reranker(model, batch_size=32)
+    assert r.score("q", TEXTS, budget_ms=50) == [float(t.split()[1]) for t in TEXTS]
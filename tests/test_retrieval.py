@@ -0,0 +1,39 @@
+# tests/test_retrieval.py
+import hashlib
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rag.retrieval import top_k, top_k_many
+
+class WordEmbeddings(Embeddings):
+    """Bag of hashed words in 16 dims: texts sharing words end up close."""
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        v = [0.0] * 16
+        for w in text.lower().split(): v[hashlib.md5(w.encode()).digest()[0] % 16] += 1.0
+        return v
+
+TEXTS = ["faiss index tuning", "chroma persistence", "bm25 keyword search", "streamlit user interface",
+         "faiss ivf quantization", "reranking with cross encoders"]
+
+@pytest.fixture
+def vs(tmp_path):
+    from langchain_chroma import Chroma
+    store = Chroma(embedding_function=WordEmbeddings(), persist_directory=str(tmp_path / "vs"))
+    store.add_documents([Document(page_content=t, metadata={"type": "pdf" if i % 2 else "markdown"})
+                         for i, t in enumerate(TEXTS)], ids=[str(i) for i in range(len(TEXTS))])
+    return store
+
+QUERIES = ["faiss tuning", "keyword search", "user interface", "cross encoders"]
+
+@pytest.mark.parametrize("flt", [None, {"type": "pdf"}])
+def test_top_k_many_matches_one_query_at_a_time(vs, flt):
+    batched = top_k_many(vs, QUERIES, k=3, filter=flt)
+    single = [top_k(vs, q, k=3, filter=flt) for q in QUERIES]
+    assert [[d.page_content for d in hits] for hits in batched] == [[d.page_content for d in hits] for hits in single]
+    if flt: assert all(d.metadata["type"] == "pdf" for hits in batched for d in hits)
+
+def test_top_k_many_of_no_queries(vs):
+    assert top_k_many(vs, [], k=3) == []
@@ -0,0 +1,60 @@
+# tests/test_tracing.py
+import asyncio, json
+import pytest
+from rag import tracing
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(tracing, "_hist", {})
+    monkeypatch.setattr(tracing, "_counters", {})
+    monkeypatch.setitem(tracing._out, "file", None)
+    tracing.enable(str(tmp_path / "spans.jsonl"), str(tmp_path / "metrics.prom"))
+    yield tmp_path
+    tracing.disable()
+
+def _spans(path) -> dict:
+    return {r["name"]: r for r in map(json.loads, path.read_text().splitlines())}
+
+def test_spans_nest_across_to_thread(trace):
+    def work():
+        with tracing.span("child", rows=3): pass
+
+    async def request():
+        with tracing.span("parent"):
+            await asyncio.to_thread(work)
+
+    asyncio.run(request())
+    spans = _spans(trace / "spans.jsonl")
+    parent, child = spans["parent"], spans["child"]
+    assert child["parent"] == parent["span"] and child["trace"] == parent["trace"] == parent["span"]
+    assert parent["parent"] is None and child["rows"] == 3
+
+def test_prometheus_buckets_are_cumulative(trace):
+    for seconds in (0.003, 0.2, 0.2, 40):
+        tracing._record("retrieval.top_k", seconds, None)
+    tracing.incr("cache.hit", 2)
+    text = tracing.prometheus_text()
+    bucket = lambda le: f'nsk_span_seconds_bucket{{span="retrieval.top_k",le="{le}"}}'
+    assert f"{bucket(0.001)} 0\n" in text and f"{bucket(0.005)} 1\n" in text
+    assert f"{bucket(0.1)} 1\n" in text and f"{bucket(0.25)} 3\n" in text and f"{bucket(30)} 3\n" in text
+    assert f"{bucket('+Inf')} 4\n" in text
+    assert 'nsk_span_seconds_count{span="retrieval.top_k"} 4\n' in text
+    assert 'nsk_span_seconds_sum{span="retrieval.top_k"} 40.403000\n' in text
+    assert "nsk_cache_hit_total 2\n" in text
+    tracing.flush()
+    assert (trace / "metrics.prom").read_text() == text
+
+def test_disabled_span_is_the_shared_noop(trace):
+    tracing.disable()
+    assert tracing.span("a") is tracing.span("b", k=1) is tracing._NOOP
+    with tracing.span("a"): pass
+    tracing.incr("cache.hit")
+    assert not tracing._hist and not tracing._counters
+
+def test_enable_twice_closes_the_previous_file(trace):
+    first = tracing._out["file"]
+    tracing.enable(str(trace / "other.jsonl"))
+    assert first.closed
+    with tracing.span("after"): pass
+    assert "after" in _spans(trace / "other.jsonl") and not (trace / "spans.jsonl").read_text()